@@ -0,0 +1,286 @@
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, current_app, request, url_for, stream_with_context
+from werkzeug.exceptions import HTTPException, BadRequest, NotFound
+import booking
+import matchmaking
+import typeahead
+from config import db
+from models import Venue, Artist, Show, DEFAULT_SHOW_DURATION
+from replicas import read_replica
+from utils import parse_datetime, encode_cursor, decode_cursor
+
+# ----------------------------------------------------------------------------#
+# Versioned JSON API.
+# ----------------------------------------------------------------------------#
+
+blueprint = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+# Rows fetched per round trip, and serialized per chunk, by the NDJSON streams
+STREAM_CHUNK_SIZE = 1000
+# Smaller bodies are not worth compressing
+MIN_GZIP_SIZE = 1024
+# Longest date range a free-slot lookup may cover
+MAX_FREE_SLOTS_RANGE = timedelta(days=92)
+
+
+class Resource:
+    """
+    A listable model: the fields clients may select (each a SQL expression), the joins some
+    fields need, and the keyset (unique sort key) pages are cut on. Queries select only the
+    requested fields, plus the keyset, so rows never go through the ORM.
+    """
+
+    def __init__(self, fields, keyset, joins=(), filters=None):
+        self.fields = fields
+        self.keyset = keyset
+        self.joins = joins
+        self.filters = filters or (lambda query, args: query)
+
+    def parse_fields(self, args):
+        if not args.get('fields'):
+            return list(self.fields)
+        names = [name.strip() for name in args['fields'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise BadRequest(f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(self.fields)}')
+        return names
+
+    def query(self, names, args):
+        selected = list(dict.fromkeys(list(self.keyset) + names))
+        query = db.session.query(*(self.fields[name].label(name) for name in selected))
+        for model, onclause, needed_by in self.joins:
+            if needed_by & set(selected):
+                query = query.join(model, onclause)
+        query = self.filters(query, args)
+        return query.order_by(*(self.fields[name] for name in self.keyset))
+
+    def after(self, query, position):
+        return query.filter(db.tuple_(*(self.fields[name] for name in self.keyset)) > db.tuple_(*position))
+
+    def encode_position(self, row):
+        if len(self.keyset) == 1:
+            return str(row[self.keyset[0]])
+        return encode_cursor(*(row[name] for name in self.keyset))
+
+    def decode_position(self, cursor):
+        if len(self.keyset) == 1:
+            return (int(cursor),)
+        return decode_cursor(cursor)
+
+
+def _entity_fields(model, seeking):
+    names = ('id', 'name', 'city', 'state', 'address', 'genres', 'phone', 'image_link', 'facebook_link',
+             'website', seeking, 'seeking_description', 'upcoming_shows_count', 'past_shows_count')
+    return {name: getattr(model, name) for name in names if hasattr(model, name)}
+
+
+def _filter_shows(query, args):
+    try:
+        if args.get('from'):
+            query = query.filter(Show.start_time >= parse_datetime(args['from']))
+        if args.get('to'):
+            query = query.filter(Show.start_time < parse_datetime(args['to']))
+        if args.get('venue_id'):
+            query = query.filter(Show.venue_id == int(args['venue_id']))
+        if args.get('artist_id'):
+            query = query.filter(Show.artist_id == int(args['artist_id']))
+    except (ValueError, OverflowError):
+        raise BadRequest('Invalid from, to, venue_id or artist_id')
+    return query
+
+
+RESOURCES = {
+    'venues': Resource(_entity_fields(Venue, 'seeking_talent'), keyset=('id',)),
+    'artists': Resource(_entity_fields(Artist, 'seeking_venue'), keyset=('id',)),
+    # The same shape as Show.serialize
+    'shows': Resource({
+        'id': Show.id,
+        'venue_id': Show.venue_id,
+        'venue_name': Venue.name,
+        'artist_id': Show.artist_id,
+        'artist_name': Artist.name,
+        'artist_image_link': Artist.image_link,
+        'start_time': Show.start_time,
+        'end_time': Show.end_time,
+    }, keyset=('start_time', 'id'), joins=(
+        (Venue, Venue.id == Show.venue_id, {'venue_name'}),
+        (Artist, Artist.id == Show.artist_id, {'artist_name', 'artist_image_link'}),
+    ), filters=_filter_shows),
+}
+
+
+# ----------------------------------------------------------------------------#
+# Encoding.
+# ----------------------------------------------------------------------------#
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default, separators=(',', ':'))
+
+
+def _accepts_gzip():
+    return 'gzip' in request.accept_encodings
+
+
+def _json_response(payload, status=200):
+    body = _dumps(payload).encode()
+    response = Response(status=status, mimetype='application/json')
+    if _accepts_gzip() and len(body) >= MIN_GZIP_SIZE:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        body = compressor.compress(body) + compressor.flush()
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.set_data(body)
+    return response
+
+
+def _ndjson_response(chunks):
+    """Streams already-encoded NDJSON chunks, gzipping them on the fly when the client accepts it."""
+    if _accepts_gzip():
+        def compressed():
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        response = Response(stream_with_context(compressed()), mimetype='application/x-ndjson')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(stream_with_context(chunks), mimetype='application/x-ndjson')
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@blueprint.errorhandler(HTTPException)
+def _error(error):
+    return _json_response({'error': error.description}, error.code)
+
+
+# ----------------------------------------------------------------------------#
+# Endpoints.
+# ----------------------------------------------------------------------------#
+
+def _parse_limit(args):
+    limit = args.get('limit', DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f'limit must be between 1 and {MAX_LIMIT}')
+    return limit
+
+
+@blueprint.route('/<any(venues, artists, shows):name>')
+@read_replica
+def list_resource(name):
+    """
+    One page of a resource in keyset order. ``fields`` selects a subset of the fields,
+    ``limit`` the page size; ``next`` is the URL of the following page, or null on the last.
+    """
+    resource = RESOURCES[name]
+    names = resource.parse_fields(request.args)
+    limit = _parse_limit(request.args)
+    query = resource.query(names, request.args)
+    if request.args.get('cursor'):
+        try:
+            position = resource.decode_position(request.args['cursor'])
+        except ValueError:
+            raise BadRequest('Invalid cursor')
+        query = resource.after(query, position)
+    rows = [row._asdict() for row in query.limit(limit + 1)]
+    page = rows[:limit]
+    next_url = None
+    if len(rows) > limit:
+        args = {key: value for key, value in request.args.items() if key != 'name'}
+        args['cursor'] = resource.encode_position(page[-1])
+        next_url = url_for('api.list_resource', name=name, _external=True, **args)
+    return _json_response({'data': [{field: row[field] for field in names} for row in page], 'next': next_url})
+
+
+@blueprint.route('/<any(venues, artists, shows):name>/<int:id>')
+@read_replica
+def get_resource(name, id):
+    resource = RESOURCES[name]
+    names = resource.parse_fields(request.args)
+    row = resource.query(names, {}).filter(resource.fields['id'] == id).first()
+    if row is None:
+        raise NotFound(f'No {name[:-1]} with id {id}')
+    row = row._asdict()
+    return _json_response({'data': {field: row[field] for field in names}})
+
+
+@blueprint.route('/<any(venues, artists, shows):name>.ndjson')
+@read_replica
+def stream_resource(name):
+    """
+    Every row of a resource (after the same ``fields`` and filters as the list), one JSON
+    object per line. Rows come from a server-side cursor ``STREAM_CHUNK_SIZE`` at a time
+    and are written out as they arrive, so no export is ever held in memory.
+    """
+    resource = RESOURCES[name]
+    names = resource.parse_fields(request.args)
+    query = resource.query(names, request.args).yield_per(STREAM_CHUNK_SIZE)
+
+    def chunks():
+        lines = []
+        for row in query:
+            row = row._asdict()
+            lines.append(_dumps({field: row[field] for field in names}))
+            if len(lines) >= STREAM_CHUNK_SIZE:
+                yield ('\n'.join(lines) + '\n').encode()
+                lines = []
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode()
+    return _ndjson_response(chunks())
+
+
+@blueprint.route('/<any(venues, artists):name>/typeahead')
+def typeahead_names(name):
+    """Venues or artists with a word of their name starting with ``q``, for pickers; answered from memory."""
+    limit = min(request.args.get('limit', current_app.config['TYPEAHEAD_LIMIT'], type=int), MAX_LIMIT)
+    entries = typeahead.get_index(name).search(request.args.get('q', ''), max(limit, 1))
+    return _json_response({'data': [entry.serialize() for entry in entries]})
+
+
+@blueprint.route('/<any(venues, artists):name>/<int:id>/matches')
+@read_replica
+def matches(name, id):
+    """
+    The artists seeking venues that match a venue seeking talent, or the reverse: same area,
+    shared genres, ranked by how many genres they share and then by show history.
+    """
+    model = Venue if name == 'venues' else Artist
+    if db.session.query(model.id).filter(model.id == id).first() is None:
+        raise NotFound(f'No {name[:-1]} with id {id}')
+    limit = _parse_limit(request.args)
+    suggest = matchmaking.suggest_artists if model is Venue else matchmaking.suggest_venues
+    return _json_response({'data': suggest(id, limit)})
+
+
+@blueprint.route('/venues/<int:id>/free-slots')
+@read_replica
+def venue_free_slots(id):
+    """
+    The venue's free time between ``from`` and ``to`` (default: the coming week), as gaps of
+    at least ``duration`` minutes (default: a standard show) between its bookings.
+    """
+    try:
+        start = parse_datetime(request.args['from']) if request.args.get('from') else datetime.now(timezone.utc)
+        end = parse_datetime(request.args['to']) if request.args.get('to') else start + timedelta(days=7)
+        duration = timedelta(minutes=int(request.args['duration'])) if request.args.get('duration') \
+            else DEFAULT_SHOW_DURATION
+    except (ValueError, OverflowError):
+        raise BadRequest('Invalid from, to or duration')
+    if not start < end <= start + MAX_FREE_SLOTS_RANGE:
+        raise BadRequest(f'to must be after from, by at most {MAX_FREE_SLOTS_RANGE.days} days')
+    if db.session.query(Venue.id).filter(Venue.id == id).first() is None:
+        raise NotFound(f'No venue with id {id}')
+    slots = booking.free_slots(id, start, end, duration)
+    return _json_response({'data': [{'start_time': slot_start, 'end_time': slot_end} for slot_start, slot_end in slots]})
@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from flask import current_app, request, url_for, send_from_directory
+
+# ----------------------------------------------------------------------------#
+# Fingerprinted, precompressed static assets.
+# ----------------------------------------------------------------------------#
+
+MANIFEST = 'manifest.json'
+
+# Text formats worth compressing; images and woff fonts are compressed already
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.ttf', '.otf', '.eot', '.ico', '.json', '.webmanifest'}
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+ONE_YEAR = 365 * 24 * 3600
+
+
+def init_app(app):
+    """
+    Serves the output of ``build`` (see manage.py build_assets) at /assets, and exposes
+    ``asset_url`` to templates. Without a build, ``asset_url`` falls back to /static.
+    """
+    app.config.setdefault('ASSETS_DIR', os.path.join(app.static_folder, 'dist'))
+    app.config.setdefault('ASSETS_MANIFEST', os.path.join(app.config['ASSETS_DIR'], MANIFEST))
+    try:
+        with open(app.config['ASSETS_MANIFEST']) as manifest:
+            app.extensions['assets'] = json.load(manifest)
+    except FileNotFoundError:
+        app.extensions['assets'] = {}
+    app.add_template_global(asset_url)
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+
+
+def asset_url(filename):
+    """Like ``url_for('static', filename=...)``, but returns the fingerprinted URL once assets are built."""
+    built = current_app.extensions['assets'].get(filename)
+    if built is None:
+        return url_for('static', filename=filename)
+    return url_for('asset', filename=built)
+
+
+def serve_asset(filename):
+    """Serves a fingerprinted asset, gzipped when the client accepts it, cacheable forever."""
+    directory = current_app.config['ASSETS_DIR']
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    gzipped = 'gzip' in request.accept_encodings and os.path.isfile(os.path.join(directory, filename + '.gz'))
+    response = send_from_directory(directory, filename + '.gz' if gzipped else filename, mimetype=mimetype)
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = ONE_YEAR
+    response.cache_control.immutable = True
+    return response
+
+
+# ----------------------------------------------------------------------------#
+# Build.
+# ----------------------------------------------------------------------------#
+
+def build(source, output):
+    """
+    Copies every file under ``source`` (except ``output`` itself) to ``output`` with a content
+    hash in its name, writes a gzip variant of text formats, and writes a manifest mapping each
+    original path to its fingerprinted one. Stylesheets are built last, with their url()
+    references rewritten to the fingerprinted files, so their own hash covers those too.
+    Returns the manifest.
+    """
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    paths = []
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != output)
+        paths.extend(posixpath.join(*os.path.relpath(os.path.join(root, name), source).split(os.sep))
+                     for name in sorted(files))
+
+    manifest = {}
+    for path in sorted(paths, key=lambda path: path.endswith('.css')):
+        with open(os.path.join(source, path), 'rb') as asset:
+            content = asset.read()
+        if path.endswith('.css'):
+            content = _rewrite_css_urls(path, content.decode('utf-8'), manifest).encode('utf-8')
+        stem, extension = posixpath.splitext(path)
+        built = f'{stem}.{hashlib.md5(content).hexdigest()[:12]}{extension}'
+        _write(os.path.join(output, built), content)
+        if extension in COMPRESSIBLE:
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                _write(os.path.join(output, built + '.gz'), compressed)
+        manifest[path] = built
+
+    with open(os.path.join(output, MANIFEST), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+def _rewrite_css_urls(path, css, manifest):
+    directory = posixpath.dirname(path)
+
+    def rewrite(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        built = manifest.get(posixpath.normpath(posixpath.join(directory, target)))
+        if built is None:
+            return match.group(0)
+        return f'url({quote}{posixpath.relpath(built, directory or ".")}{suffix}{quote})'
+
+    return CSS_URL.sub(rewrite, css)
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as asset:
+        asset.write(content)
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for fyyur.
+
+Each module is runnable with ``python -m benchmarks.<module>`` from the project root.
+Benchmarks that touch the database run against BENCH_DATABASE_URL, which must be a scratch database.
+"""
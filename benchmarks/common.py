@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+
+def use_bench_database():
+    """
+    Points the app at BENCH_DATABASE_URL. Benchmarks that generate data truncate the tables,
+    so they refuse to run against the regular DATABASE_URL. Call before importing config.
+    """
+    url = os.getenv('BENCH_DATABASE_URL')
+    if not url:
+        sys.exit('Set BENCH_DATABASE_URL to a scratch database, its contents will be replaced.')
+    os.environ['DATABASE_URL'] = url
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(function, *args, **kwargs):
+    """Calls ``function`` and returns its result with the elapsed wall time in milliseconds."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers, *rows]:
+        print('  '.join(str(value).rjust(width) for value, width in zip(row, widths)))
+
+
+def latency_row(name, samples):
+    return [name, len(samples),
+            f'{percentile(samples, 0.50):.3f}',
+            f'{percentile(samples, 0.95):.3f}',
+            f'{percentile(samples, 0.99):.3f}',
+            f'{sum(samples) / len(samples):.3f}']
+
+
+LATENCY_HEADERS = ['case', 'n', 'p50 ms', 'p95 ms', 'p99 ms', 'mean ms']
@@ -0,0 +1,84 @@
+"""
+Fast synthetic data generation, done entirely in SQL with generate_series.
+
+Replaces the contents of the venue, artist, show and show_archive tables, so only point it at a scratch database.
+"""
+from config import db
+from models import Show
+
+WORDS = ['blue', 'note', 'velvet', 'room', 'musical', 'hop', 'park', 'square', 'dueling', 'pianos',
+         'golden', 'lounge', 'basement', 'echo', 'hall', 'garage', 'cellar', 'rooftop', 'harbor', 'lantern',
+         'crow', 'fox', 'wild', 'silver', 'stage', 'tavern', 'theatre', 'club', 'social', 'corner']
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Chicago', 'IL'),
+          ('Seattle', 'WA'), ('Nashville', 'TN'), ('Denver', 'CO'), ('Portland', 'OR'),
+          ('Atlanta', 'GA'), ('Boston', 'MA'), ('Detroit', 'MI'), ('Memphis', 'TN')]
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+          'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+          'Rock n Roll', 'Soul', 'Other']
+
+ENTITY_SQL = """
+    INSERT INTO {table} (name, city, state, {extra_columns} genres, phone, image_link, {seeking}, seeking_description)
+    SELECT initcap(w[1 + floor(random() * array_length(w, 1))::int] || ' ' ||
+                   w[1 + floor(random() * array_length(w, 1))::int] || ' ' || i),
+           c[1 + (i % array_length(c, 1))],
+           s[1 + (i % array_length(s, 1))],
+           {extra_values}
+           ARRAY[g[1 + floor(random() * array_length(g, 1))::int],
+                 g[1 + floor(random() * array_length(g, 1))::int]],
+           '555-555-' || lpad((i % 10000)::text, 4, '0'),
+           'https://picsum.photos/seed/{table}' || i || '/400',
+           random() < 0.3,
+           NULL
+    FROM generate_series(1, :count) AS i,
+         (SELECT CAST(:words AS varchar[]) AS w, CAST(:cities AS varchar[]) AS c,
+                 CAST(:states AS varchar[]) AS s, CAST(:genres AS varchar[]) AS g) AS vocabulary
+"""
+
+# Venue and artist popularity is skewed (random() squared), and start times spread over
+# the past ``:past_days`` days plus ``:future_days`` days of upcoming bookings.
+# Shows that would double-book a venue or artist are skipped, so slightly fewer than ``:count`` are made.
+# Every month partition the generated start times can fall in
+PARTITIONS_SQL = """
+    SELECT create_show_partition((month AT TIME ZONE 'UTC')::date)
+    FROM generate_series(now() - make_interval(days => :past_days),
+                         now() + make_interval(days => :future_days) + interval '1 month',
+                         interval '1 month') AS month
+"""
+
+SHOW_SQL = """
+    INSERT INTO show (venue_id, artist_id, start_time, end_time)
+    SELECT venue_id, artist_id, start_time, start_time + interval '2 hours'
+    FROM (SELECT 1 + floor(:venues * random() ^ 2)::int AS venue_id,
+                 1 + floor(:artists * random() ^ 2)::int AS artist_id,
+                 date_trunc('hour', now() - make_interval(days => :past_days)
+                                    + random() * make_interval(days => :past_days + :future_days)) AS start_time
+          FROM generate_series(1, :count)) AS generated
+    ON CONFLICT DO NOTHING
+"""
+
+
+def generate(venues, artists, shows, past_days=3 * 365, future_days=180, seed=0.42):
+    """Replaces all venues, artists and shows with ``venues``, ``artists`` and ``shows`` synthetic rows."""
+    vocabulary = {
+        'words': WORDS,
+        'cities': [city for city, _ in CITIES],
+        'states': [state for _, state in CITIES],
+        'genres': GENRES,
+    }
+    db.session.execute(db.text('TRUNCATE show, show_archive, venue, artist RESTART IDENTITY CASCADE'))
+    db.session.execute(db.text('SELECT setseed(:seed)'), {'seed': seed})
+    db.session.execute(db.text(ENTITY_SQL.format(table='venue', seeking='seeking_talent',
+                                                 extra_columns='address,',
+                                                 extra_values="i || ' Main St',")),
+                       {'count': venues, **vocabulary})
+    db.session.execute(db.text(ENTITY_SQL.format(table='artist', seeking='seeking_venue',
+                                                 extra_columns='', extra_values='')),
+                       {'count': artists, **vocabulary})
+    db.session.execute(db.text(PARTITIONS_SQL), {'past_days': past_days, 'future_days': future_days})
+    db.session.execute(db.text(SHOW_SQL), {'count': shows, 'venues': venues, 'artists': artists,
+                                           'past_days': past_days, 'future_days': future_days})
+    Show.repair_counters()
+    db.session.commit()
+    for table in ('venue', 'artist', 'show'):
+        db.session.execute(db.text(f'ANALYZE {table}'))
+    db.session.commit()
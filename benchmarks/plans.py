@@ -0,0 +1,129 @@
+"""
+Query-plan regression check.
+
+Drives every read route through the Flask test client on large synthetic data, captures
+each SQL statement the route issues and runs EXPLAIN on it. Fails (exit status 1) if any
+plan scans the show table sequentially, or sequentially filters venue or artist where an
+index should answer. Unfiltered scans of venue/artist are allowed, since the /venues and
+/artists listings legitimately read every row.
+
+Usage: python -m benchmarks.plans [--venues N] [--artists N] [--shows N] [--no-seed]
+"""
+import argparse
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from benchmarks.common import use_bench_database
+
+# Tables big enough that a filtered sequential scan is a regression
+INDEXED_TABLES = {'venue', 'artist', 'show'}
+# Tables that must never be scanned sequentially, filtered or not
+NEVER_SCANNED = {'show'}
+# Month partitions (show_2024_05) count as their parent table
+PARTITION_SUFFIX = re.compile(r'_\d{4}_\d{2}$')
+
+
+def route_requests(venue_id, artist_id):
+    """(method, url, form data) for every read path worth checking."""
+    from utils import encode_cursor
+    middle = datetime.now(timezone.utc) - timedelta(days=30)
+    return [
+        ('GET', '/venues', None),
+        ('GET', '/artists', None),
+        ('GET', '/venues?genre=Jazz&genre=Blues', None),
+        ('GET', '/artists?genre=Jazz&genre=Blues&state=TX', None),
+        ('GET', '/shows', None),
+        ('GET', f'/shows?cursor={encode_cursor(middle, 0)}', None),
+        ('GET', f'/shows?from={middle.date()}&to={(middle + timedelta(days=7)).date()}', None),
+        ('GET', f'/venues/{venue_id}', None),
+        ('GET', f'/venues/{venue_id}?past_page=5', None),
+        ('GET', f'/artists/{artist_id}', None),
+        ('GET', f'/artists/{artist_id}?past_page=5', None),
+        ('POST', '/venues/search', {'search_term': 'velvet'}),
+        ('POST', '/venues/search', {'search_term': 'Austin, TX'}),
+        ('POST', '/artists/search', {'search_term': 'lantern'}),
+    ]
+
+
+def capture_statements(app, db, requests):
+    """Runs ``requests`` and returns [(request, statement, parameters)] for every SELECT issued."""
+    captured = []
+    current = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            captured.append((current[0], statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        for method, url, data in requests:
+            current[:] = [f'{method} {url}']
+            response = client.open(url, method=method, data=data)
+            if response.status_code != 200:
+                raise RuntimeError(f'{method} {url} answered {response.status_code}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return captured
+
+
+def explain(db, statement, parameters):
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+        return cursor.fetchone()[0][0]['Plan']
+    finally:
+        connection.close()
+
+
+def sequential_scans(plan):
+    """Yields the offending sequential scan nodes of ``plan``."""
+    if plan['Node Type'] == 'Seq Scan':
+        relation = PARTITION_SUFFIX.sub('', plan['Relation Name'])
+        if relation in NEVER_SCANNED or (relation in INDEXED_TABLES and 'Filter' in plan):
+            yield plan
+    for child in plan.get('Plans', []):
+        yield from sequential_scans(child)
+
+
+def check(app, db):
+    """Returns a list of (request, statement, offending plan node) regressions."""
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    app.config['SEARCH_BACKEND'] = 'database'
+    regressions = []
+    with app.app_context():
+        for request, statement, parameters in capture_statements(app, db, route_requests(1, 1)):
+            for node in sequential_scans(explain(db, statement, parameters)):
+                regressions.append((request, statement, node))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--venues', type=int, default=20000)
+    parser.add_argument('--artists', type=int, default=20000)
+    parser.add_argument('--shows', type=int, default=1000000)
+    parser.add_argument('--no-seed', action='store_true', help='check against the existing data')
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app import app
+    from config import db
+    from benchmarks import datagen
+
+    if not args.no_seed:
+        with app.app_context():
+            datagen.generate(args.venues, args.artists, args.shows)
+
+    regressions = check(app, db)
+    for request, statement, node in regressions:
+        print(f'{request}: sequential scan on {node["Relation Name"]} (filter: {node.get("Filter", "none")})')
+        print(f'    {" ".join(statement.split())}')
+    print(f'{len(regressions)} plan regressions')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
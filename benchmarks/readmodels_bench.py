@@ -0,0 +1,101 @@
+"""
+Compares the read models with hydrating ORM instances and calling their serialize properties:
+
+  artists  Artist.query.all() + serialize_by_name_id   vs  Artist.get_listing()
+  search   ORM name ILIKE + serialize_by_name_id       vs  DatabaseSearchBackend
+  feed     Show.query + joinedload + serialize          vs  Show.get_feed()
+
+For each case it reports the mean time per call, the peak Python memory allocated during one
+call and the memory still held by its result.
+
+Usage: python -m benchmarks.readmodels_bench [--venues N] [--artists N] [--shows N] [--iterations N] [--no-seed]
+"""
+import argparse
+import gc
+import statistics
+import tracemalloc
+from benchmarks.common import timed, print_table, use_bench_database
+
+HEADERS = ['case', 'variant', 'rows', 'mean ms', 'peak KiB', 'held KiB']
+
+
+def measure(function, iterations):
+    """(rows returned, mean ms, peak KiB during one call, KiB still held by its result)."""
+    function()
+    durations = [timed(function)[1] for _ in range(iterations)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(result), statistics.mean(durations), (peak - before) / 1024, (held - before) / 1024
+
+
+def cases(limit):
+    """(case, variant, function) for the ORM path and the read model path of each view."""
+    from sqlalchemy.orm import joinedload
+    from config import db
+    from models import Artist, Venue, Show
+    import search
+
+    def orm_artists():
+        return [artist.serialize_by_name_id for artist in Artist.query.all()]
+
+    def orm_search():
+        venues = Venue.query.filter(Venue.name.ilike('%velvet%')).order_by(Venue.name).limit(limit).all()
+        return [venue.serialize_by_name_id for venue in venues]
+
+    def orm_feed():
+        shows = Show.query.options(joinedload(Show.venue), joinedload(Show.artist)) \
+            .order_by(Show.start_time, Show.id) \
+            .limit(limit) \
+            .all()
+        return [show.serialize for show in shows]
+
+    def expunged(function):
+        # Each call starts from an empty identity map, as a request does
+        def run():
+            try:
+                return function()
+            finally:
+                db.session.expunge_all()
+        return run
+
+    backend = search.DatabaseSearchBackend()
+    return [
+        ('artists', 'orm', expunged(orm_artists)),
+        ('artists', 'read model', expunged(Artist.get_listing)),
+        ('search', 'orm', expunged(orm_search)),
+        ('search', 'read model', expunged(lambda: backend.search_venues('velvet', limit))),
+        ('feed', 'orm', expunged(orm_feed)),
+        ('feed', 'read model', expunged(lambda: Show.get_feed(limit=limit)[0])),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--venues', type=int, default=20000)
+    parser.add_argument('--artists', type=int, default=100000)
+    parser.add_argument('--shows', type=int, default=200000)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=500, help='rows per search and feed call')
+    parser.add_argument('--no-seed', action='store_true', help='measure against the existing data')
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app import app
+    from benchmarks import datagen
+
+    with app.app_context():
+        if not args.no_seed:
+            datagen.generate(args.venues, args.artists, args.shows)
+        rows = []
+        for case, variant, function in cases(args.limit):
+            count, mean_ms, peak_kib, held_kib = measure(function, args.iterations)
+            rows.append([case, variant, count, f'{mean_ms:.1f}', f'{peak_kib:.0f}', f'{held_kib:.0f}'])
+    print_table(HEADERS, rows)
+
+
+if __name__ == '__main__':
+    main()
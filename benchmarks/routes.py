@@ -0,0 +1,186 @@
+"""
+Drives every route in views.py through the Flask test client at several data sizes and reports
+latency percentiles, SQL statements per request and peak Python memory per request.
+Routes whose statement count grows with the data size are flagged, since that is how N+1
+patterns show up.
+
+Usage: python -m benchmarks.routes [--sizes small,medium,large] [--iterations N] [--with-cache]
+
+Each size replaces the contents of BENCH_DATABASE_URL with synthetic data.
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from benchmarks.common import percentile, print_table, use_bench_database
+
+# (venues, artists, shows)
+SIZES = {
+    'small': (500, 500, 10000),
+    'medium': (5000, 5000, 100000),
+    'large': (20000, 20000, 1000000),
+}
+
+ENTITY_FORM = {
+    'name': 'Benchmark Hall',
+    'city': 'Austin',
+    'state': 'TX',
+    'address': '1 Main St',
+    'phone': '555-555-5555',
+    'image_link': 'https://picsum.photos/400',
+    'genres': ['Jazz', 'Blues'],
+    'facebook_link': 'https://www.facebook.com/benchmark',
+    'website': 'https://example.com',
+    'seeking_description': 'Looking for local acts',
+}
+
+
+def route_cases(venues, artists):
+    """
+    (name, method, url, form data, flashed on success) with url and form data factories,
+    called with the iteration number. Write cases come last so reads run against the
+    generated data, and must flash their success message, so a failing form is not timed
+    as a write. Deletes remove the least popular rows, a different one per iteration.
+    """
+    # Far enough apart that no two iterations double-book a venue or artist
+    start_time = datetime.now(timezone.utc) + timedelta(days=30)
+    slot = lambda i: (start_time + timedelta(hours=3 * i)).strftime('%Y-%m-%d %H:%M:%S')
+    middle = datetime.now(timezone.utc) - timedelta(days=30)
+    return [
+        ('index', 'GET', lambda i: '/', None, None),
+        ('venues', 'GET', lambda i: '/venues', None, None),
+        ('show_venue', 'GET', lambda i: f'/venues/{1 + i % 10}', None, None),
+        ('show_venue past page', 'GET', lambda i: f'/venues/{1 + i % 10}?past_page=3', None, None),
+        ('search_venues', 'POST', lambda i: '/venues/search', lambda i: {'search_term': 'velvet'}, None),
+        ('artists', 'GET', lambda i: '/artists', None, None),
+        ('show_artist', 'GET', lambda i: f'/artists/{1 + i % 10}', None, None),
+        ('search_artists', 'POST', lambda i: '/artists/search', lambda i: {'search_term': 'lantern'}, None),
+        ('shows', 'GET', lambda i: '/shows', None, None),
+        ('shows window', 'GET', lambda i: f'/shows?from={middle.date()}&to={(middle + timedelta(days=7)).date()}',
+         None, None),
+        ('create_venue_form', 'GET', lambda i: '/venues/create', None, None),
+        ('edit_venue', 'GET', lambda i: '/venues/2/edit', None, None),
+        ('create_artist_form', 'GET', lambda i: '/artists/create', None, None),
+        ('edit_artist', 'GET', lambda i: '/artists/2/edit', None, None),
+        ('create_shows', 'GET', lambda i: '/shows/create', None, None),
+        ('create_venue_submission', 'POST', lambda i: '/venues/create', lambda i: ENTITY_FORM,
+         'successfully listed'),
+        ('edit_venue_submission', 'POST', lambda i: '/venues/2/edit', lambda i: ENTITY_FORM,
+         'successfully edited'),
+        ('create_artist_submission', 'POST', lambda i: '/artists/create', lambda i: ENTITY_FORM,
+         'successfully listed'),
+        ('edit_artist_submission', 'POST', lambda i: '/artists/2/edit', lambda i: ENTITY_FORM,
+         'successfully edited'),
+        ('create_show_submission', 'POST', lambda i: '/shows/create',
+         lambda i: {'artist_id': 1 + i % 10, 'venue_id': 1 + i % 10, 'start_time': slot(i), 'duration': 120},
+         'successfully listed'),
+        ('delete_venue', 'DELETE', lambda i: f'/venues/{venues - i}/delete', None, 'successfully deteled'),
+        ('delete_artist', 'DELETE', lambda i: f'/artists/{artists - i}/delete', None, 'successfully deteled'),
+    ]
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        self.engine = engine
+        event.listen(engine, 'before_cursor_execute', self)
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def close(self):
+        event.remove(self.engine, 'before_cursor_execute', self)
+
+
+def flashed_messages(client, response):
+    """The messages a request flashed: rendered into its page, or left in the session by a redirect."""
+    if response.status_code in (301, 302, 303):
+        with client.session_transaction() as session:
+            return [message for _, message in session.pop('_flashes', [])]
+    return [response.get_data(as_text=True)]
+
+
+def check_response(client, method, url, response, success):
+    if response.status_code >= 500:
+        raise RuntimeError(f'{method} {url} answered {response.status_code}')
+    if success and not any(success in message for message in flashed_messages(client, response)):
+        raise RuntimeError(f'{method} {url} did not flash "{success}", the write failed')
+
+
+def run_case(client, counter, method, url, data, success, iterations):
+    """Returns latencies (ms), statement counts and peak memory (KiB) over ``iterations`` requests."""
+    latencies, statements, peaks = [], [], []
+    for i in range(iterations):
+        counter.count = 0
+        start = time.perf_counter()
+        response = client.open(url(i), method=method, data=data(i) if data else None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statements.append(counter.count)
+        check_response(client, method, url(i), response, success)
+    # Memory is measured in a separate pass, tracemalloc would distort the latencies
+    tracemalloc.start()
+    for i in range(iterations, iterations + min(iterations, 5)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        response = client.open(url(i), method=method, data=data(i) if data else None)
+        peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+        check_response(client, method, url(i), response, success)
+    tracemalloc.stop()
+    return latencies, statements, peaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='small,medium', help=f'comma separated, from {", ".join(SIZES)}')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--with-cache', action='store_true', help='keep the response cache enabled')
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app import app
+    from config import db, build_indexes
+    from cache import response_cache
+    from benchmarks import datagen
+
+    app.config['RESPONSE_CACHE_ENABLED'] = args.with_cache
+    # The write cases post their forms without a CSRF token
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+    statements_by_size = defaultdict(dict)
+
+    for size in args.sizes.split(','):
+        venues, artists, shows = SIZES[size]
+        with app.app_context():
+            datagen.generate(venues, artists, shows)
+            counter = StatementCounter(db.engine)
+        # As gunicorn does, so index builds are not timed as requests
+        build_indexes(app)
+        response_cache.clear()
+
+        rows = []
+        for name, method, url, data, success in route_cases(venues, artists):
+            latencies, statements, peaks = run_case(client, counter, method, url, data, success, args.iterations)
+            statements_by_size[name][size] = statistics.median(statements)
+            rows.append([name,
+                         f'{percentile(latencies, 0.50):.2f}',
+                         f'{percentile(latencies, 0.95):.2f}',
+                         f'{percentile(latencies, 0.99):.2f}',
+                         f'{statistics.median(statements):g}',
+                         f'{max(peaks):.0f}'])
+        counter.close()
+
+        print(f'\n== {size}: {venues} venues, {artists} artists, {shows} shows ==')
+        print_table(['route', 'p50 ms', 'p95 ms', 'p99 ms', 'statements', 'peak KiB'], rows)
+
+    growing = [name for name, counts in statements_by_size.items() if len(set(counts.values())) > 1]
+    if growing:
+        print('\nStatement count changes with data size (possible N+1):')
+        for name in growing:
+            print(f'  {name}: ' + ', '.join(f'{size}={count:g}' for size, count in statements_by_size[name].items()))
+
+
+if __name__ == '__main__':
+    main()
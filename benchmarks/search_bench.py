@@ -0,0 +1,110 @@
+"""
+Compares the search paths on synthetic venues:
+
+  ilike     the original ``name ILIKE '%term%'`` query plus serialize_by_name_id
+  database  the pg_trgm ranked DatabaseSearchBackend
+  memory    the InMemorySearchBackend inverted index
+
+Usage: python -m benchmarks.search_bench [--rows N] [--queries N] [--seed] [--memory-only]
+
+--seed inserts the synthetic venues first; without it the database cases run
+against whatever BENCH_DATABASE_URL already holds.
+"""
+import argparse
+import random
+from benchmarks.common import timed, print_table, latency_row, use_bench_database, LATENCY_HEADERS
+
+WORDS = ['blue', 'note', 'velvet', 'room', 'musical', 'hop', 'park', 'square', 'dueling', 'pianos',
+         'golden', 'lounge', 'basement', 'echo', 'hall', 'garage', 'cellar', 'rooftop', 'harbor', 'lantern',
+         'crow', 'fox', 'wild', 'silver', 'stage', 'tavern', 'theatre', 'club', 'social', 'corner']
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Chicago', 'IL'),
+          ('Seattle', 'WA'), ('Nashville', 'TN'), ('Denver', 'CO'), ('Portland', 'OR')]
+GENRES = ['Jazz', 'Blues', 'Rock n Roll', 'Folk', 'Hip-Hop', 'Classical', 'Soul', 'Reggae']
+
+
+def generate_venues(count, rng):
+    venues = []
+    for _ in range(count):
+        city, state = rng.choice(CITIES)
+        venues.append({
+            'name': ' '.join(rng.sample(WORDS, rng.randint(2, 4))).title(),
+            'city': city,
+            'state': state,
+            'address': f'{rng.randint(1, 9999)} Main St',
+            'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'phone': '555-555-5555',
+            'image_link': 'https://example.com/venue.jpg',
+            'seeking_talent': False,
+        })
+    return venues
+
+
+def generate_terms(count, rng):
+    """Whole words, prefixes and single-typo words in roughly equal parts."""
+    terms = []
+    for _ in range(count):
+        word = rng.choice(WORDS)
+        kind = rng.randrange(3)
+        if kind == 1:
+            word = word[:rng.randint(2, len(word))]
+        elif kind == 2 and len(word) > 3:
+            i = rng.randrange(len(word) - 1)
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        terms.append(word)
+    return terms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--seed', action='store_true')
+    parser.add_argument('--memory-only', action='store_true')
+    args = parser.parse_args()
+
+    if not args.memory_only:
+        use_bench_database()
+    from app import app
+    from config import db
+    from models import Venue
+    import search
+    from readmodels import EntityRow
+
+    rng = random.Random(42)
+    venues = generate_venues(args.rows, rng)
+    terms = generate_terms(args.queries, rng)
+    results = []
+
+    index = search.InvertedIndex()
+    _, build_ms = timed(lambda: [index.add(i, {'name': venue['name'],
+                                               'city': venue['city'],
+                                               'state': venue['state'],
+                                               'genres': ' '.join(venue['genres'])},
+                                           EntityRow(i, venue['name'], 0))
+                                 for i, venue in enumerate(venues)])
+    print(f'Built in-memory index over {len(index)} venues in {build_ms:.0f} ms')
+    results.append(latency_row('memory', [timed(index.search, term, args.limit)[1] for term in terms]))
+
+    if not args.memory_only:
+        with app.app_context():
+            if args.seed:
+                for start in range(0, len(venues), 10000):
+                    db.session.bulk_insert_mappings(Venue, venues[start:start + 10000])
+                db.session.commit()
+                db.session.execute(db.text('ANALYZE venue'))
+
+            def ilike(term):
+                matches = Venue.query.filter(Venue.name.ilike(f'%{term}%')).all()
+                return [venue.serialize_by_name_id for venue in matches]
+
+            backend = search.DatabaseSearchBackend()
+            results.append(latency_row('ilike', [timed(ilike, term)[1] for term in terms]))
+            results.append(latency_row('database', [timed(backend.search_venues, term, args.limit)[1]
+                                                    for term in terms]))
+
+    print_table(LATENCY_HEADERS, results)
+
+
+if __name__ == '__main__':
+    main()
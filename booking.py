@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
+from config import db
+from models import Venue, Artist, Show, DEFAULT_SHOW_DURATION, MAX_SHOW_DURATION
+
+# ----------------------------------------------------------------------------#
+# Show bookings.
+# ----------------------------------------------------------------------------#
+
+# PostgreSQL error codes
+FOREIGN_KEY_VIOLATION = '23503'
+CHECK_VIOLATION = '23514'
+EXCLUSION_VIOLATION = '23P01'
+
+# The exclusion constraints only see shows of the same month partition, so shows starting this
+# close to a month boundary (the longest show the database accepts) are checked across partitions too
+BOUNDARY_MARGIN = MAX_SHOW_DURATION
+# Advisory lock namespaces serializing those checks per venue and per artist
+VENUE_LOCK, ARTIST_LOCK = 1, 2
+
+
+class BookingError(ValueError):
+    pass
+
+
+class UnknownReference(BookingError):
+    pass
+
+
+class BookingConflict(BookingError):
+    """Raised when a show overlaps other shows of its venue or artist, listed in ``conflicts``."""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__('; '.join(
+            f'The {conflict["booked_by"]} is already booked from {conflict["start_time"]:%Y-%m-%d %H:%M} '
+            f'to {conflict["end_time"]:%Y-%m-%d %H:%M} (show {conflict["id"]})' for conflict in conflicts
+        ) or 'The show overlaps another booking')
+
+
+def _overlapping(start, end):
+    # The same expression as the exclusion constraints, so their GiST indexes answer it
+    return db.func.tstzrange(Show.start_time, Show.end_time).op('&&')(db.func.tstzrange(start, end))
+
+
+def _near_month_boundary(start, end):
+    end = end.astimezone(timezone.utc)
+    return datetime(end.year, end.month, 1, tzinfo=timezone.utc) > start - BOUNDARY_MARGIN
+
+
+def check_references(venue_id, artist_id):
+    """Raises UnknownReference unless both the venue and the artist exist, checked with one query."""
+    venue_exists, artist_exists = db.session.query(
+        db.session.query(Venue.id).filter(Venue.id == venue_id).exists(),
+        db.session.query(Artist.id).filter(Artist.id == artist_id).exists()).one()
+    missing = []
+    if not venue_exists:
+        missing.append(f'There is no venue with id {venue_id}')
+    if not artist_exists:
+        missing.append(f'There is no artist with id {artist_id}')
+    if missing:
+        raise UnknownReference('. '.join(missing))
+
+
+def book(show):
+    """
+    Inserts ``show`` and counts it on its venue and artist. The exclusion constraints make the
+    INSERT itself the conflict check, a single probe of their GiST indexes; the overlapping
+    shows are only looked up once it fails, or when the show is near a month boundary, where
+    it may overlap shows in the neighbouring partition. Raises BookingConflict or UnknownReference.
+    """
+    if show.end_time is None:
+        show.end_time = show.start_time + DEFAULT_SHOW_DURATION
+    try:
+        with db.session.begin_nested():
+            db.session.add(show)
+            db.session.flush()
+            if _near_month_boundary(show.start_time, show.end_time):
+                db.session.execute(db.text('SELECT pg_advisory_xact_lock(:venues, :venue_id), '
+                                           'pg_advisory_xact_lock(:artists, :artist_id)'),
+                                   {'venues': VENUE_LOCK, 'venue_id': show.venue_id,
+                                    'artists': ARTIST_LOCK, 'artist_id': show.artist_id})
+                conflicts = find_conflicts(show.venue_id, show.artist_id, show.start_time, show.end_time,
+                                           exclude_id=show.id)
+                if conflicts:
+                    raise BookingConflict(conflicts)
+    except IntegrityError as e:
+        code = getattr(e.orig, 'pgcode', None)
+        if code == CHECK_VIOLATION and e.orig.diag.constraint_name is None:
+            # No partition accepts the row
+            raise BookingError(f'Shows cannot be booked for {show.start_time:%B %Y} yet')
+        if code == CHECK_VIOLATION and e.orig.diag.constraint_name == 'show_max_duration':
+            raise BookingError(f'Shows cannot last longer than {MAX_SHOW_DURATION // timedelta(hours=1)} hours')
+        if code == EXCLUSION_VIOLATION:
+            raise BookingConflict(find_conflicts(show.venue_id, show.artist_id, show.start_time, show.end_time))
+        if code == FOREIGN_KEY_VIOLATION:
+            if e.orig.diag.constraint_name == 'show_venue_id_fkey':
+                raise UnknownReference(f'There is no venue with id {show.venue_id}')
+            raise UnknownReference(f'There is no artist with id {show.artist_id}')
+        raise
+    show.add_to_counters()
+
+
+def find_conflicts(venue_id, artist_id, start, end, exclude_id=None):
+    """Shows of the venue or the artist overlapping [start, end), each tagged with which of the two it blocks."""
+    query = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time) \
+        .filter(db.or_(Show.venue_id == venue_id, Show.artist_id == artist_id), _overlapping(start, end))
+    if exclude_id is not None:
+        query = query.filter(Show.id != exclude_id)
+    return [{**row._asdict(), 'booked_by': 'venue' if str(row.venue_id) == str(venue_id) else 'artist'}
+            for row in query.order_by(Show.start_time, Show.id)]
+
+
+def free_slots(venue_id, start, end, min_duration=DEFAULT_SHOW_DURATION):
+    """
+    The gaps of at least ``min_duration`` between the venue's shows within [start, end),
+    as (start, end) pairs in order. One indexed range query fetches the bookings.
+    """
+    bookings = db.session.query(Show.start_time, Show.end_time) \
+        .filter(Show.venue_id == venue_id, _overlapping(start, end)) \
+        .order_by(Show.start_time) \
+        .all()
+    min_duration = max(min_duration, timedelta(0))
+    slots = []
+    free_from = start
+    for booked_from, booked_until in bookings:
+        if booked_from > free_from and booked_from - free_from >= min_duration:
+            slots.append((free_from, booked_from))
+        free_from = max(free_from, booked_until)
+    if end > free_from and end - free_from >= min_duration:
+        slots.append((free_from, end))
+    return slots
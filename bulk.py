@@ -0,0 +1,363 @@
+"""
+Bulk import and export of venues, artists and shows as CSV or JSON lines.
+
+Imports parse and type-check each record in Python, COPY the valid ones into a temporary
+staging table in batches, reject rows whose id already exists, whose foreign keys point
+nowhere or that double-book a venue or artist with one set-based statement per batch,
+and insert the rest with INSERT ... SELECT.
+Exports stream a table through a server-side cursor, so memory use does not grow with it.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from config import db
+from models import Venue, Artist, Show, DEFAULT_SHOW_DURATION, MAX_SHOW_DURATION
+from utils import parse_datetime
+
+MODELS = {model.__tablename__: model for model in (Venue, Artist, Show)}
+
+# Derived columns (counters, versions, is_past) are computed when rows are inserted, so they are neither imported
+# nor exported
+COLUMNS = {
+    'venue': ('id', 'name', 'city', 'state', 'address', 'genres', 'phone', 'image_link', 'facebook_link',
+              'website', 'seeking_talent', 'seeking_description'),
+    'artist': ('id', 'name', 'city', 'state', 'genres', 'phone', 'image_link', 'facebook_link',
+               'website', 'seeking_venue', 'seeking_description'),
+    'show': ('id', 'venue_id', 'artist_id', 'start_time', 'end_time'),
+}
+
+# Values for required columns a record may leave out, computed from the values before them
+DEFAULTS = {
+    'end_time': lambda values: values['start_time'] + DEFAULT_SHOW_DURATION,
+}
+
+FORMATS = ('csv', 'jsonl')
+
+
+class RejectedRow(ValueError):
+    pass
+
+
+def detect_format(path, format=None):
+    format = format or path.rsplit('.', 1)[-1].lower()
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format {format!r}, expected one of {", ".join(FORMATS)}')
+    return format
+
+
+# ----------------------------------------------------------------------------#
+# Value conversion.
+# ----------------------------------------------------------------------------#
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', 't', 'yes', 'y', '1'):
+        return True
+    if text in ('false', 'f', 'no', 'n', '0'):
+        return False
+    raise ValueError(f'not a boolean: {value!r}')
+
+
+def _parse_timestamp(value):
+    try:
+        date = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return parse_datetime(value)
+    return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
+
+def _parse_list(value):
+    if isinstance(value, list):
+        return [str(item).strip() for item in value]
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+def _converter(column):
+    """Returns a function turning a raw CSV/JSON value into a valid value for ``column``, or raising ValueError."""
+    python_type = column.type.python_type
+    if python_type is bool:
+        return _parse_bool
+    if python_type is int:
+        return int
+    if python_type is datetime:
+        return _parse_timestamp
+    if python_type is list:
+        return _parse_list
+    length = getattr(column.type, 'length', None)
+
+    def convert(value):
+        text = str(value)
+        if length and len(text) > length:
+            raise ValueError(f'longer than {length} characters')
+        return text
+    return convert
+
+
+def _copy_value(value):
+    """Formats a value for COPY's text format."""
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        items = ('"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value)
+        value = '{' + ','.join(items) + '}'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _export_value(value, format):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if format == 'csv' and isinstance(value, list):
+        return ','.join(value)
+    return value
+
+
+# ----------------------------------------------------------------------------#
+# Import.
+# ----------------------------------------------------------------------------#
+
+def read_records(path, format):
+    """Yields (line number, record dict) pairs from a CSV file with a header row or a JSON lines file."""
+    with open(path, newline='') as source:
+        if format == 'csv':
+            reader = csv.DictReader(source)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, RejectedRow(f'invalid JSON: {e}')
+                    continue
+                if not isinstance(record, dict):
+                    record = RejectedRow('not a JSON object')
+                yield line_number, record
+
+
+class Importer:
+    """
+    Loads records into one table in batches of ``batch_size``. Each batch is committed on its own,
+    so a failure halfway through a large file keeps the batches already loaded.
+    ``rejected`` collects (line number, reason, record) for every row that was not imported.
+    """
+
+    def __init__(self, table, batch_size=100000):
+        self.table = table
+        self.model = MODELS[table]
+        self.columns = COLUMNS[table]
+        self.converters = {name: _converter(self.model.__table__.columns[name]) for name in self.columns}
+        self.batch_size = batch_size
+        self.staging = f'staging_{table}'
+        self.imported = 0
+        self.rejected = []
+
+    def run(self, records):
+        with db.engine.connect() as connection:
+            connection.execute(db.text(
+                f'CREATE TEMP TABLE {self.staging} ON COMMIT DELETE ROWS AS '
+                f'SELECT 0 AS line, {", ".join(self.columns)} FROM {self.table} WITH NO DATA'))
+            batch, raw = [], {}
+            for line, record in records:
+                row = self._convert(line, record)
+                if row is None:
+                    continue
+                batch.append(row)
+                raw[line] = record
+                if len(batch) >= self.batch_size:
+                    self._load(connection, batch, raw)
+                    batch, raw = [], {}
+            if batch:
+                self._load(connection, batch, raw)
+            connection.execute(db.text(f'DROP TABLE {self.staging}'))
+        return self.imported
+
+    def _convert(self, line, record):
+        if isinstance(record, RejectedRow):
+            self.rejected.append((line, str(record), None))
+            return None
+        values = {}
+        for name in self.columns:
+            value = record.get(name)
+            column = self.model.__table__.columns[name]
+            if value is None or value == '':
+                if name == 'id' or column.nullable:
+                    values[name] = None
+                    continue
+                if name in DEFAULTS:
+                    values[name] = DEFAULTS[name](values)
+                    continue
+                if column.type.python_type is bool:
+                    value = False
+                elif column.type.python_type is list:
+                    value = []
+                else:
+                    self.rejected.append((line, f'missing {name}', record))
+                    return None
+            try:
+                values[name] = self.converters[name](value)
+            except (TypeError, ValueError, OverflowError) as e:
+                self.rejected.append((line, f'invalid {name}: {e}', record))
+                return None
+        if 'end_time' in values and values['end_time'] <= values['start_time']:
+            self.rejected.append((line, 'end_time is not after start_time', record))
+            return None
+        return [line, *values.values()]
+
+    def _load(self, connection, batch, raw):
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        with connection.begin():
+            cursor = connection.connection.cursor()
+            cursor.copy_expert(f'COPY {self.staging} (line, {", ".join(self.columns)}) FROM STDIN', buffer)
+            cursor.close()
+            connection.execute(db.text(f'ANALYZE {self.staging}'))
+            rejected = connection.execute(db.text(self._reject_sql())).fetchall()
+            if self.model is Show:
+                # Historical or far-future shows may fall in months with no partition yet
+                connection.execute(db.text(
+                    f"SELECT create_show_partition(month) FROM (SELECT DISTINCT "
+                    f"date_trunc('month', start_time AT TIME ZONE 'UTC')::date AS month FROM {self.staging}) AS months"))
+            # Ids the file supplies must not be handed out again by the sequence
+            connection.execute(db.text(
+                f'SELECT setval(:sequence, max(id)) FROM {self.staging} '
+                f'HAVING max(id) > (SELECT last_value FROM {self._sequence()})'), {'sequence': self._sequence()})
+            inserted = connection.execute(db.text(self._insert_sql()), {'sequence': self._sequence()}).scalar()
+        self.imported += inserted
+        self.rejected.extend((line, reason, raw[line]) for line, reason in rejected)
+
+    def _rules(self):
+        """(reason, SQL condition on staged row s) pairs; a row matching any of them is rejected."""
+        rules = [
+            ('duplicate id', f'EXISTS (SELECT 1 FROM {self.table} t WHERE t.id = s.id)'),
+            ('duplicate id in file', f'EXISTS (SELECT 1 FROM {self.staging} o WHERE o.id = s.id AND o.line < s.line)'),
+        ]
+        for key in self.model.__table__.foreign_keys:
+            rules.append((f'unknown {key.parent.name}',
+                          f'NOT EXISTS (SELECT 1 FROM {key.column.table.name} r '
+                          f'WHERE r.{key.column.name} = s.{key.parent.name})'))
+        if self.model is Show:
+            rules.append(('duplicate id of an archived show',
+                          'EXISTS (SELECT 1 FROM show_archive t WHERE t.id = s.id)'))
+            # Rejected by the show_max_duration constraint, which would fail the whole batch
+            rules.append((f'longer than {MAX_SHOW_DURATION // timedelta(hours=1)} hours',
+                          f"s.end_time - s.start_time > interval '{MAX_SHOW_DURATION.total_seconds():.0f} seconds'"))
+            # The show_*_during_excl constraints would fail the whole batch on a double booking
+            for column in ('venue_id', 'artist_id'):
+                during = 'tstzrange({0}.start_time, {0}.end_time) && tstzrange(s.start_time, s.end_time)'
+                rules.append((f'overlaps a show with the same {column}',
+                              f'EXISTS (SELECT 1 FROM show t WHERE t.{column} = s.{column} AND {during.format("t")})'))
+                rules.append((f'overlaps an earlier show in the file with the same {column}',
+                              f'EXISTS (SELECT 1 FROM {self.staging} o '
+                              f'WHERE o.{column} = s.{column} AND o.line < s.line AND {during.format("o")})'))
+        return rules
+
+    def _reject_sql(self):
+        rules = self._rules()
+        reason = ' '.join(f"WHEN {condition} THEN '{reason}'" for reason, condition in rules)
+        return f"""
+            DELETE FROM {self.staging} s
+            WHERE {' OR '.join(condition for _, condition in rules)}
+            RETURNING s.line, CASE {reason} END
+        """
+
+    def _insert_sql(self):
+        """
+        Inserts the staged rows and returns how many. Shows are counted on their venue and artist
+        by the same statement, one grouped UPDATE per table like ROLL_FORWARD_SQL, so the counters
+        are right as each batch commits.
+        """
+        values = ['COALESCE(s.id, nextval(:sequence))' if name == 'id' else f's.{name}' for name in self.columns]
+        if self.model is Show:
+            counters = ''.join(f"""
+                , {table}_counts AS (
+                    UPDATE {table} SET upcoming_shows_count = upcoming_shows_count + counted.upcoming,
+                                       past_shows_count = past_shows_count + counted.past
+                    FROM (SELECT {table}_id AS id,
+                                 count(*) FILTER (WHERE NOT is_past) AS upcoming,
+                                 count(*) FILTER (WHERE is_past) AS past
+                          FROM inserted GROUP BY {table}_id) AS counted
+                    WHERE {table}.id = counted.id
+                )""" for table in ('venue', 'artist'))
+            return f"""
+                WITH inserted AS (
+                    INSERT INTO show ({', '.join(self.columns)}, is_past)
+                    SELECT {', '.join(values)}, s.start_time < now() FROM {self.staging} s ORDER BY s.line
+                    RETURNING venue_id, artist_id, is_past
+                ){counters}
+                SELECT count(*) FROM inserted
+            """
+        return f"""
+            WITH inserted AS (
+                INSERT INTO {self.table} ({', '.join(self.columns)})
+                SELECT {', '.join(values)} FROM {self.staging} s ORDER BY s.line
+                RETURNING id
+            )
+            SELECT count(*) FROM inserted
+        """
+
+    def _sequence(self):
+        return f'{self.table}_id_seq'
+
+
+def import_file(table, path, format=None, batch_size=100000):
+    """Imports ``path`` into ``table``. Returns the Importer, with its imported count and rejected rows."""
+    importer = Importer(table, batch_size)
+    importer.run(read_records(path, detect_format(path, format)))
+    with db.engine.connect() as connection:
+        connection.execute(db.text(f'ANALYZE {table}'))
+    return importer
+
+
+def write_rejected(rejected, path):
+    with open(path, 'w', newline='') as report:
+        writer = csv.writer(report)
+        writer.writerow(['line', 'reason', 'record'])
+        for line, reason, record in sorted(rejected, key=lambda rejection: rejection[0]):
+            writer.writerow([line, reason, json.dumps(record, default=str) if record is not None else ''])
+
+
+# ----------------------------------------------------------------------------#
+# Export.
+# ----------------------------------------------------------------------------#
+
+def export_file(table, path, format=None, chunk_size=10000):
+    """
+    Writes every row of ``table`` to ``path`` in id order. Rows are fetched ``chunk_size`` at a time
+    from a server-side cursor, so memory use stays flat however large the table is.
+    Returns the number of rows written.
+    """
+    format = detect_format(path, format)
+    model, columns = MODELS[table], COLUMNS[table]
+    query = db.select([model.__table__.columns[name] for name in columns]).order_by(model.id)
+    count = 0
+    with db.engine.connect() as connection, open(path, 'w', newline='') as target:
+        result = connection.execution_options(stream_results=True).execute(query)
+        writer = csv.writer(target) if format == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                values = [_export_value(value, format) for value in row]
+                if writer:
+                    writer.writerow(values)
+                else:
+                    target.write(json.dumps(dict(zip(columns, values))))
+                    target.write('\n')
+            count += len(rows)
+    return count
@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session, g, jsonify, make_response
+import replicas
+from profiling import require_secret
+
+# ----------------------------------------------------------------------------#
+# Rendered-page response cache.
+# ----------------------------------------------------------------------------#
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded LRU cache whose entries expire after ``ttl`` seconds.
+    Entries carry tags so writes can evict every entry that depends on a changed row.
+    A value is not stored if one of its tags was invalidated after its data was read, since it
+    may predate that write; nor, when it was read from a replica, if one was invalidated in the
+    ``replica_lag`` seconds before, since the replica may not have the write yet.
+    """
+
+    def __init__(self, maxsize=512, ttl=60, replica_lag=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.replica_lag = replica_lag
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        # Tag -> when it was last invalidated; older invalidations are forgotten, and values
+        # read before _forgotten_before are not stored since they cannot be checked
+        self._invalidated = {}
+        self._forgotten_before = float('-inf')
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=(), read_at=None, from_replica=False):
+        """
+        Stores ``value``, unless it may miss a write to one of ``tags``. ``read_at`` is the
+        time.monotonic() taken before its data was read (by default, now).
+        """
+        with self._lock:
+            now = time.monotonic()
+            since = now if read_at is None else read_at
+            if from_replica:
+                since -= self.replica_lag
+            if since < self._forgotten_before or any(self._invalidated.get(tag, since) > since for tag in tags):
+                return
+            self._discard(key)
+            self._entries[key] = (now + self.ttl, value, frozenset(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Evicts every entry carrying any of ``tags``."""
+        with self._lock:
+            now = time.monotonic()
+            # A page that took longer than an entry lives to render, or came from a replica lagging
+            # that far, is not worth caching, so older invalidations need not be kept
+            horizon = now - max(self.ttl, self.replica_lag)
+            if horizon > self._forgotten_before:
+                self._invalidated = {tag: at for tag, at in self._invalidated.items() if at >= horizon}
+                self._forgotten_before = horizon
+            self._invalidated.update(dict.fromkeys(tags, now))
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._invalidated.clear()
+            self._forgotten_before = time.monotonic()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+
+response_cache = LRUCache()
+
+
+def init_app(app):
+    response_cache.maxsize = app.config['RESPONSE_CACHE_SIZE']
+    response_cache.ttl = app.config['RESPONSE_CACHE_TTL']
+    # How far behind the replica may be, the same bound read-your-writes pinning assumes
+    response_cache.replica_lag = app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] if app.config['SQLALCHEMY_BINDS'] else 0
+
+    def cache_metrics():
+        require_secret()
+        return jsonify(response_cache.stats())
+    app.add_url_rule('/_metrics/cache', 'cache_metrics', cache_metrics)
+
+
+def add_cache_tags(*tags):
+    """Tags the page being rendered with rows only known once its data is loaded."""
+    g.setdefault('cache_tags', set()).update(tags)
+
+
+def cached(*tags):
+    """
+    Caches a GET view's rendered response, keyed by endpoint, view arguments and query string.
+    ``tags`` are formatted with the view arguments, e.g. 'venue:{venue_id}'.
+    Requests with pending flash messages bypass the cache, since the page would show them.
+    Each worker process has its own cache, so writes handled by another worker
+    only become visible here once the entry's TTL runs out.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if not current_app.config['RESPONSE_CACHE_ENABLED'] or session.get('_flashes'):
+                return view(**kwargs)
+            key = (request.endpoint,
+                   tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))))
+            entry = response_cache.get(key)
+            if entry is not None:
+                body, status, headers = entry
+                return current_app.response_class(body, status=status, headers=headers)
+            # Taken before the view reads anything, so a write invalidating the page meanwhile is noticed
+            read_at = time.monotonic()
+            response = make_response(view(**kwargs))
+            if response.status_code == 200:
+                headers = [(name, value) for name, value in response.headers if name.lower() != 'set-cookie']
+                page_tags = {tag.format(**kwargs) for tag in tags} | g.pop('cache_tags', set())
+                response_cache.set(key, (response.get_data(), response.status_code, headers), page_tags,
+                                   read_at=read_at, from_replica=replicas.reading_from_replica())
+            return response
+        return wrapper
+    return decorator
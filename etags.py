@@ -0,0 +1,83 @@
+import hashlib
+import os
+from datetime import timezone
+from functools import wraps
+from flask import current_app, request, session, make_response
+
+# ----------------------------------------------------------------------------#
+# Conditional GETs.
+# ----------------------------------------------------------------------------#
+
+
+def init_app(app):
+    app.config.setdefault('ETAG_SALT', _fingerprint_templates(app))
+
+
+def conditional(validators):
+    """
+    Answers conditional GETs for a view from cheap row/table versions.
+
+    ``validators`` is called with the view arguments and returns ``(parts, last_modified)``,
+    or None to skip conditional handling (e.g. so the view can 404). ``parts`` is hashed with
+    the endpoint, arguments, query string and ETAG_SALT into a strong ETag. A request whose
+    If-None-Match (or, failing that, If-Modified-Since) still matches gets a 304 without the
+    view running. Requests with pending flash messages always render, to show them.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if session.get('_flashes'):
+                return view(**kwargs)
+            result = validators(**kwargs)
+            if result is None:
+                return view(**kwargs)
+            parts, last_modified = result
+            etag = _etag(parts, kwargs)
+            last_modified = last_modified.replace(microsecond=0)
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def _etag(parts, kwargs):
+    key = repr((current_app.config['ETAG_SALT'],
+                request.endpoint,
+                sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)),
+                parts))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def _fingerprint_templates(app):
+    """
+    Hashes the templates and the built asset URLs they link to,
+    so a deploy that changes the markup or the assets changes every ETag.
+    """
+    digest = hashlib.sha1()
+    for root, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as template:
+                digest.update(template.read())
+    for path, built in sorted(app.extensions.get('assets', {}).items()):
+        digest.update(f'{path}={built}'.encode())
+    return digest.hexdigest()
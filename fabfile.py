@@ -6,9 +6,11 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q tests", capture=True)
+        if result.succeeded:
+            result = local(
+                "python -m benchmarks.plans --shows 200000", capture=True
+            )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
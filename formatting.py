@@ -0,0 +1,90 @@
+"""
+Date and time formatting for templates (the ``datetime`` filter).
+
+A DateTimeFormatter per locale compiles the babel pattern of each named format once and
+memoizes formatted values in a bounded LRU cache, so repeated show times on a page are
+formatted once. The show serializers format a whole page with format_many and hand the
+templates the strings (``start_time_display``), so show tiles never go through the filter.
+Like babel.dates.format_datetime, times are rendered in UTC.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+import dateutil.parser
+from babel import Locale
+from babel.dates import parse_pattern
+from flask import current_app, has_app_context
+
+# Named formats, as babel patterns
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+# The format show tiles are rendered with
+SHOW_TIME_FORMAT = 'full'
+
+DEFAULT_LOCALE = 'en_US'
+DEFAULT_CACHE_SIZE = 4096
+
+
+class DateTimeFormatter:
+    """Formats datetimes (or parseable strings) for one locale, remembering the last ``cache_size`` results."""
+
+    def __init__(self, locale=DEFAULT_LOCALE, cache_size=DEFAULT_CACHE_SIZE):
+        self.locale = Locale.parse(locale)
+        self._patterns = {name: parse_pattern(pattern) for name, pattern in FORMATS.items()}
+        self.format = lru_cache(maxsize=cache_size)(self._format)
+
+    def pattern(self, format):
+        """The compiled pattern of a named format, or of a babel pattern string, compiled once."""
+        compiled = self._patterns.get(format)
+        if compiled is None:
+            compiled = self._patterns[format] = parse_pattern(format)
+        return compiled
+
+    def format_many(self, values, format='medium'):
+        """Formats ``values`` in order, each distinct value once."""
+        formatted = {}
+        for value in values:
+            if value not in formatted:
+                formatted[value] = self.format(value, format)
+        return [formatted[value] for value in values]
+
+    def _format(self, value, format):
+        if not isinstance(value, datetime):
+            value = dateutil.parser.parse(value)
+        # Naive values are taken as UTC, as babel does. babel would keep an aware value's own zone,
+        # but it is converted to UTC so the database session's zone does not change what is shown
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        else:
+            value = value.astimezone(timezone.utc)
+        return self.pattern(format).apply(value, self.locale)
+
+
+_formatters = {}
+
+
+def init_app(app):
+    """Registers the ``datetime`` template filter and compiles the DATETIME_LOCALE formatter up front."""
+    app.jinja_env.filters['datetime'] = format_datetime
+    with app.app_context():
+        get_formatter()
+
+
+def get_formatter(locale=None):
+    """The formatter for ``locale``, by default the DATETIME_LOCALE setting, created once per locale."""
+    config = current_app.config if has_app_context() else {}
+    locale = locale or config.get('DATETIME_LOCALE', DEFAULT_LOCALE)
+    formatter = _formatters.get(locale)
+    if formatter is None:
+        formatter = _formatters.setdefault(
+            locale, DateTimeFormatter(locale, config.get('DATETIME_FORMAT_CACHE_SIZE', DEFAULT_CACHE_SIZE)))
+    return formatter
+
+
+def format_datetime(value, format='medium', locale=None):
+    return get_formatter(locale).format(value, format)
+
+
+def format_many(values, format='medium', locale=None):
+    return get_formatter(locale).format_many(values, format)
@@ -0,0 +1,34 @@
+import gc
+import os
+
+# ----------------------------------------------------------------------------#
+# Gunicorn settings, used by the Procfile.
+# ----------------------------------------------------------------------------#
+
+os.environ.setdefault('FYYUR_PROFILE', 'production')
+
+# Import the app, compile its templates and build its indexes once in the master,
+# so forked workers start warm and share that memory copy-on-write.
+preload_app = True
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def when_ready(server):
+    from app import app
+    from config import db, build_indexes
+    from replicas import dispose_engines
+    build_indexes(app)
+    # Connections opened while warming up must not be shared with the workers
+    with app.app_context():
+        dispose_engines(app, db)
+    # Keep the garbage collector from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import app
+    from config import db
+    from replicas import warm_pool
+    with app.app_context():
+        warm_pool(app, db)
@@ -0,0 +1,110 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from flask import current_app, g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('fyyur.requests')
+
+# ----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+# ----------------------------------------------------------------------------#
+
+
+class RepeatedQueryError(Exception):
+    """Raised in strict mode when a request runs the same statement too many times."""
+
+    def __init__(self, fingerprint, count):
+        super().__init__(f'Statement ran {count} times in one request: {fingerprint}')
+        self.fingerprint = fingerprint
+        self.count = count
+
+
+class RequestStats:
+    __slots__ = ('started', 'queries', 'db_time', 'fingerprints')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+
+    def repeated(self, limit=5):
+        """The most repeated fingerprints among those run more than once."""
+        return {fingerprint: count for fingerprint, count in self.fingerprints.most_common(limit) if count > 1}
+
+
+_PARAMETER = re.compile(r'%\(\w+\)s|%s|\?|:\w+')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Normalizes a statement so executions differing only in parameters or literals compare equal."""
+    statement = _LITERAL.sub('?', _PARAMETER.sub('?', statement))
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+def init_app(app):
+    """Hooks the request cycle of ``app``; statements are timed by listeners on every SQLAlchemy engine."""
+    app.config.setdefault('SQL_INSTRUMENTATION', True)
+    app.config.setdefault('SQL_STRICT_REPEAT_LIMIT', None)
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+    if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request_stats)
+    app.after_request(_report_request_stats)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # A connection runs one statement at a time, so one slot is enough: a statement that raises
+    # (and so never reaches _after_cursor_execute) has its start time replaced by the next one's
+    conn.info['query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = g.get('sql_stats') if has_request_context() else None
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_time += elapsed
+    key = fingerprint(statement)
+    stats.fingerprints[key] += 1
+    limit = current_app.config['SQL_STRICT_REPEAT_LIMIT']
+    if limit is not None and stats.fingerprints[key] > limit:
+        raise RepeatedQueryError(key, stats.fingerprints[key])
+
+
+def _start_request_stats():
+    g.sql_stats = RequestStats()
+
+
+def _report_request_stats(response):
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    db_ms = stats.db_time * 1000
+    response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{stats.queries} queries"')
+    response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        'db_ms': round(db_ms, 2),
+        'queries': stats.queries,
+        'repeated': stats.repeated(),
+    }))
+    return response
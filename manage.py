@@ -1,7 +1,13 @@
 from flask_script import Manager
 from flask_migrate import Migrate, MigrateCommand
 
-from config import app, db
+import assets
+import bulk
+import partitions
+
+from app import app
+from config import db
+from models import Show
 
 migrate = Migrate(app, db)
 manager = Manager(app)
@@ -9,5 +15,69 @@ manager = Manager(app)
 manager.add_command('db', MigrateCommand)
 
 
+@manager.command
+def roll_shows():
+    """Moves shows that have started from the upcoming to the past show counters"""
+    rolled = Show.roll_forward()
+    db.session.commit()
+    print(f'Rolled {rolled} shows forward')
+
+
+@manager.command
+def repair_counters():
+    """Recomputes every venue and artist show counter from scratch"""
+    Show.repair_counters()
+    db.session.commit()
+    print('Show counters repaired')
+
+
+@manager.option('--detach-only', dest='detach_only', action='store_true',
+                help='leave old partitions as standalone tables instead of archiving their shows')
+@manager.option('--archive-after', dest='archive_after', type=int, default=partitions.ARCHIVE_AFTER_MONTHS,
+                help='months of past partitions to keep live')
+@manager.option('--ahead', dest='ahead', type=int, default=partitions.MONTHS_AHEAD,
+                help='months of partitions to create after the current one')
+def maintain_partitions(ahead=partitions.MONTHS_AHEAD, archive_after=partitions.ARCHIVE_AFTER_MONTHS,
+                        detach_only=False):
+    """Creates the coming months' show partitions and archives the partitions of months long past"""
+    created = partitions.ensure_partitions(ahead)
+    print(f'Created {len(created)} partitions: {", ".join(created) or "none"}')
+    handled = partitions.archive_partitions(archive_after, detach_only)
+    print(f'{"Detached" if detach_only else "Archived"} {len(handled)} partitions: {", ".join(handled) or "none"}')
+
+
+@manager.command
+def build_assets():
+    """Writes fingerprinted, gzipped copies of the static files and their manifest to ASSETS_DIR"""
+    manifest = assets.build(app.static_folder, app.config['ASSETS_DIR'])
+    print(f'Built {len(manifest)} assets into {app.config["ASSETS_DIR"]}')
+
+
+# Flask-Script registers options bottom-up, so positional arguments are listed last to first
+@manager.option('--format', dest='format', choices=bulk.FORMATS, help='overrides the format implied by the extension')
+@manager.option('--batch-size', dest='batch_size', type=int, default=100000)
+@manager.option('--rejected', dest='rejected', help='where to write rejected rows, defaults to <path>.rejected.csv')
+@manager.option('path', help='a .csv file with a header row or a .jsonl file')
+@manager.option('table', choices=list(bulk.MODELS), help='venue, artist or show')
+def import_rows(table, path, format=None, batch_size=100000, rejected=None):
+    """Bulk loads rows into a table with COPY, rejecting rows with duplicate ids or unknown references"""
+    importer = bulk.import_file(table, path, format, batch_size)
+    print(f'Imported {importer.imported} rows into {table}')
+    if importer.rejected:
+        rejected = rejected or f'{path}.rejected.csv'
+        bulk.write_rejected(importer.rejected, rejected)
+        print(f'Rejected {len(importer.rejected)} rows, see {rejected}')
+
+
+@manager.option('--format', dest='format', choices=bulk.FORMATS, help='overrides the format implied by the extension')
+@manager.option('--chunk-size', dest='chunk_size', type=int, default=10000)
+@manager.option('path', help='a .csv or .jsonl file to write')
+@manager.option('table', choices=list(bulk.MODELS), help='venue, artist or show')
+def export_rows(table, path, format=None, chunk_size=10000):
+    """Streams every row of a table to a CSV or JSON lines file"""
+    count = bulk.export_file(table, path, format, chunk_size)
+    print(f'Exported {count} rows from {table} to {path}')
+
+
 if __name__ == '__main__':
     manager.run()
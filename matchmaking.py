@@ -0,0 +1,213 @@
+"""
+Artist and venue matchmaking.
+
+Suggests, for a venue seeking talent, the artists seeking venues in the same area that play
+its genres, and the reverse. Suggestions come from a per-process inverted index keyed by
+(area, genre): a profile's postings are looked up once per genre and the number of hits per
+candidate is their genre overlap, so no pair is ever compared. Ties are broken by show
+history, first the shows the pair already played together, then the candidate's past shows.
+
+The index is built when the web server starts (or on first use), kept current by the write
+hooks and rebuilt in the background once it is older than MATCHMAKING_INDEX_MAX_AGE seconds,
+like the in-memory search index; requests keep using the previous index until the new one is
+ready, and the writes made meanwhile are replayed onto it.
+"""
+import heapq
+import threading
+from collections import Counter, defaultdict, namedtuple
+from flask import current_app
+from config import db
+from models import Venue, Artist
+from readmodels import snapshot_session
+from utils import BackgroundRebuild
+
+VENUE, ARTIST = 'venue', 'artist'
+OTHER_SIDE = {VENUE: ARTIST, ARTIST: VENUE}
+
+Profile = namedtuple('Profile', 'id name image_link city state genres past_shows')
+
+# Shows played together, per (venue id, artist id), of the venues and artists seeking each other
+PLAYED_TOGETHER_SQL = db.text("""
+    SELECT shows.venue_id, shows.artist_id, count(*)
+    FROM (SELECT venue_id, artist_id FROM show
+          UNION ALL
+          SELECT venue_id, artist_id FROM show_archive) AS shows
+    JOIN venue ON venue.id = shows.venue_id AND venue.seeking_talent
+    JOIN artist ON artist.id = shows.artist_id AND artist.seeking_venue
+    GROUP BY shows.venue_id, shows.artist_id
+""")
+
+
+def suggest_artists(venue_id, limit=None):
+    return get_index().suggest(VENUE, venue_id, limit or current_app.config['MATCHES_LIMIT'])
+
+
+def suggest_venues(artist_id, limit=None):
+    return get_index().suggest(ARTIST, artist_id, limit or current_app.config['MATCHES_LIMIT'])
+
+
+def get_index():
+    return rebuild.get(current_app._get_current_object())
+
+
+# ----------------------------------------------------------------------------#
+# Write hooks.
+# ----------------------------------------------------------------------------#
+
+def add_venue(venue):
+    _add(VENUE, venue, venue.seeking_talent)
+
+
+def remove_venue(venue_id):
+    rebuild.update(lambda index: index.remove(VENUE, venue_id))
+
+
+def add_artist(artist):
+    _add(ARTIST, artist, artist.seeking_venue)
+
+
+def remove_artist(artist_id):
+    rebuild.update(lambda index: index.remove(ARTIST, artist_id))
+
+
+def add_show(show):
+    venue_id, artist_id, is_past = int(show.venue_id), int(show.artist_id), show.is_past
+    rebuild.update(lambda index: index.add_show(venue_id, artist_id, is_past))
+
+
+def _add(side, entity, seeking):
+    id, profile = entity.id, _profile(entity) if seeking else None
+    rebuild.update(lambda index: index.add(side, id, profile))
+
+
+def _load():
+    # One snapshot, so the show counts agree with the profiles and with the replayed writes
+    with snapshot_session() as session:
+        venues = [_profile(row) for row in session.query(
+            Venue.id, Venue.name, Venue.image_link, Venue.city, Venue.state, Venue.genres,
+            Venue.past_shows_count).filter(Venue.seeking_talent)]
+        artists = [_profile(row) for row in session.query(
+            Artist.id, Artist.name, Artist.image_link, Artist.city, Artist.state, Artist.genres,
+            Artist.past_shows_count).filter(Artist.seeking_venue)]
+        played = {(venue_id, artist_id): count
+                  for venue_id, artist_id, count in session.execute(PLAYED_TOGETHER_SQL)}
+    return MatchIndex(venues, artists, played)
+
+
+def _area(city, state):
+    return city.strip().lower(), state.strip().upper()
+
+
+def _profile(entity):
+    return Profile(entity.id, entity.name, entity.image_link, entity.city, entity.state,
+                   frozenset(entity.genres or ()), entity.past_shows_count)
+
+
+def _postings(venues, artists):
+    """Postings ((area, genre) -> set of ids) per side for the given profiles."""
+    postings = {VENUE: defaultdict(set), ARTIST: defaultdict(set)}
+    for side, profiles in ((VENUE, venues), (ARTIST, artists)):
+        for profile in profiles:
+            area = _area(profile.city, profile.state)
+            for genre in profile.genres:
+                postings[side][area + (genre,)].add(profile.id)
+    return postings
+
+
+class MatchIndex:
+    """Inverted (area, genre) index over the venues seeking talent and the artists seeking venues."""
+
+    def __init__(self, venues=(), artists=(), played=()):
+        self._lock = threading.RLock()
+        self._postings = _postings(venues, artists)
+        self._profiles = {VENUE: {profile.id: profile for profile in venues},
+                          ARTIST: {profile.id: profile for profile in artists}}
+        self._played = Counter(played)
+
+    def __len__(self):
+        return len(self._profiles[VENUE]) + len(self._profiles[ARTIST])
+
+    # ------------------------------------------------------------------------#
+    # Incremental updates.
+    # ------------------------------------------------------------------------#
+
+    def add(self, side, id, profile):
+        """
+        Indexes ``profile`` in place of any previous version of ``id``, keeping the past show count
+        the index has kept up; a None profile (no longer seeking) just removes it.
+        """
+        with self._lock:
+            previous = self._profiles[side].get(id)
+            self.remove(side, id)
+            if profile is None:
+                return
+            if previous is not None:
+                profile = profile._replace(past_shows=previous.past_shows)
+            area = _area(profile.city, profile.state)
+            for genre in profile.genres:
+                self._postings[side][area + (genre,)].add(profile.id)
+            self._profiles[side][profile.id] = profile
+
+    def remove(self, side, id):
+        with self._lock:
+            profile = self._profiles[side].pop(id, None)
+            if profile is None:
+                return
+            area = _area(profile.city, profile.state)
+            for genre in profile.genres:
+                key = area + (genre,)
+                self._postings[side][key].discard(id)
+                if not self._postings[side][key]:
+                    del self._postings[side][key]
+
+    def add_show(self, venue_id, artist_id, is_past):
+        with self._lock:
+            if venue_id in self._profiles[VENUE] and artist_id in self._profiles[ARTIST]:
+                self._played[venue_id, artist_id] += 1
+            if is_past:
+                for side, id in ((VENUE, venue_id), (ARTIST, artist_id)):
+                    profile = self._profiles[side].get(id)
+                    if profile is not None:
+                        self._profiles[side][id] = profile._replace(past_shows=profile.past_shows + 1)
+
+    # ------------------------------------------------------------------------#
+    # Suggestions.
+    # ------------------------------------------------------------------------#
+
+    def suggest(self, side, id, limit):
+        """
+        The best ``limit`` matches on the other side for the ``side`` profile ``id``, or an empty
+        list when it is not seeking. Each is a dict with the candidate's id, name, image, area,
+        the genres they share, the shows the two played together and the candidate's past shows.
+        """
+        with self._lock:
+            profile = self._profiles[side].get(id)
+            if profile is None:
+                return []
+            other = OTHER_SIDE[side]
+            area = _area(profile.city, profile.state)
+            overlap = Counter()
+            for genre in profile.genres:
+                overlap.update(self._postings[other].get(area + (genre,), ()))
+            candidates = self._profiles[other]
+
+            def played(candidate_id):
+                return self._played[(id, candidate_id) if side == VENUE else (candidate_id, id)]
+
+            ranked = heapq.nsmallest(limit, overlap, key=lambda candidate_id: (-overlap[candidate_id],
+                                                                               -played(candidate_id),
+                                                                               -candidates[candidate_id].past_shows,
+                                                                               candidates[candidate_id].name.lower()))
+            return [{
+                'id': candidate.id,
+                'name': candidate.name,
+                'image_link': candidate.image_link,
+                'city': candidate.city,
+                'state': candidate.state,
+                'shared_genres': sorted(profile.genres & candidate.genres),
+                'shows_together': played(candidate.id),
+                'past_shows_count': candidate.past_shows,
+            } for candidate in (candidates[candidate_id] for candidate_id in ranked)]
+
+
+rebuild = BackgroundRebuild(_load, 'matchmaking index', 'MATCHMAKING_INDEX_MAX_AGE')
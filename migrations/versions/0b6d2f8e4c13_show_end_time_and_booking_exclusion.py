@@ -0,0 +1,54 @@
+"""Show end time and booking exclusion constraints
+
+Revision ID: 0b6d2f8e4c13
+Revises: f4a9c3e7b210
+Create Date: 2026-10-18 19:11:08.342981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6d2f8e4c13'
+down_revision = 'f4a9c3e7b210'
+branch_labels = None
+depends_on = None
+
+# Shows booked before durations existed are assumed to last this long
+DEFAULT_DURATION = "interval '2 hours'"
+
+# (constraint, column) - no two shows of the same venue, or of the same artist, may overlap in time
+EXCLUSIONS = [
+    ('show_venue_id_during_excl', 'venue_id'),
+    ('show_artist_id_during_excl', 'artist_id'),
+]
+
+
+def upgrade():
+    # btree_gist lets a GiST index compare the integer ids with = alongside the time ranges
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column('show', sa.Column('end_time', sa.DateTime(timezone=True), nullable=True))
+    op.execute(f'UPDATE show SET end_time = start_time + {DEFAULT_DURATION}')
+    op.alter_column('show', 'end_time', nullable=False)
+    op.create_check_constraint('show_end_time_after_start_time', 'show', 'end_time > start_time')
+
+    connection = op.get_bind()
+    for name, column in EXCLUSIONS:
+        overlaps = connection.execute(sa.text(f"""
+            SELECT count(*) FROM show a JOIN show b
+              ON a.{column} = b.{column} AND a.id < b.id
+             AND tstzrange(a.start_time, a.end_time) && tstzrange(b.start_time, b.end_time)
+        """)).scalar()
+        if overlaps:
+            raise RuntimeError(f'{overlaps} pairs of shows overlap on the same {column}. '
+                               f'Reschedule or delete them, then run the upgrade again.')
+        op.execute(f'ALTER TABLE show ADD CONSTRAINT {name} '
+                   f'EXCLUDE USING gist ({column} WITH =, tstzrange(start_time, end_time) WITH &&)')
+
+
+def downgrade():
+    for name, _ in EXCLUSIONS:
+        op.drop_constraint(name, 'show')
+    op.drop_constraint('show_end_time_after_start_time', 'show')
+    op.drop_column('show', 'end_time')
@@ -0,0 +1,36 @@
+"""Trigram search indexes
+
+Revision ID: 5d2c8e1f4a7b
+Revises: cba2ef9f3778
+Create Date: 2026-10-18 09:12:41.308126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2c8e1f4a7b'
+down_revision = 'cba2ef9f3778'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ('ix_venue_name_trgm', 'venue', 'name'),
+    ('ix_venue_city_trgm', 'venue', 'city'),
+    ('ix_artist_name_trgm', 'artist', 'name'),
+    ('ix_artist_city_trgm', 'artist', 'city'),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(name, table, [column],
+                        postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for name, table, _ in TRIGRAM_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,177 @@
+"""Partition show by month and add show_archive
+
+Revision ID: 6e1a9d4b7f35
+Revises: 0b6d2f8e4c13
+Create Date: 2026-10-18 20:24:51.806114
+
+Rewrites show as a table range-partitioned by month on start_time (months are UTC), copying
+every row, so run it in a maintenance window on large databases. Partitions are created by the
+create_show_partition(month) function, which manage.py maintain_partitions also calls ahead of
+time. PostgreSQL cannot enforce exclusion constraints across partitions, so each partition
+gets its own double-booking constraints; booking.book checks shows near a month boundary
+itself. The primary key has to include the partition key, so it becomes (id, start_time).
+
+show_archive holds the shows of partitions archived by maintain_partitions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1a9d4b7f35'
+down_revision = '0b6d2f8e4c13'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the latest show
+MONTHS_AHEAD = 12
+
+COLUMNS = 'id, venue_id, artist_id, start_time, end_time, is_past, version, updated_at'
+
+# (name, table, columns, partial index predicate), as in e3b57f6a1c92
+INDEXES = [
+    ('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'], None),
+    ('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'], None),
+    ('ix_show_start_time_id', 'show', ['start_time', 'id'], None),
+    ('ix_show_start_time_upcoming', 'show', ['start_time'], 'NOT is_past'),
+]
+
+EXCLUSIONS = [
+    ('{table}_venue_id_during_excl', 'venue_id'),
+    ('{table}_artist_id_during_excl', 'artist_id'),
+]
+
+CREATE_SHOW_PARTITION = '''
+    CREATE FUNCTION create_show_partition(month date) RETURNS text AS $$
+    DECLARE
+        first_day date := date_trunc('month', month);
+        partition text := 'show_' || to_char(first_day, 'YYYY_MM');
+    BEGIN
+        IF to_regclass(partition) IS NOT NULL THEN
+            RETURN NULL;
+        END IF;
+        EXECUTE format('CREATE TABLE %I PARTITION OF show FOR VALUES FROM (%L) TO (%L)', partition,
+                       first_day::timestamp AT TIME ZONE 'UTC',
+                       (first_day + interval '1 month')::timestamp AT TIME ZONE 'UTC');
+        EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I EXCLUDE USING gist '
+                       '(venue_id WITH =, tstzrange(start_time, end_time) WITH &&)',
+                       partition, partition || '_venue_id_during_excl');
+        EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I EXCLUDE USING gist '
+                       '(artist_id WITH =, tstzrange(start_time, end_time) WITH &&)',
+                       partition, partition || '_artist_id_during_excl');
+        EXECUTE format('CREATE TRIGGER %I BEFORE UPDATE ON %I FOR EACH ROW EXECUTE PROCEDURE bump_row_version()',
+                       partition || '_bump_row_version', partition);
+        RETURN partition;
+    END
+    $$ LANGUAGE plpgsql
+'''
+
+
+def _create_indexes():
+    for name, table, columns, where in INDEXES:
+        op.create_index(name, table, columns, postgresql_where=sa.text(where) if where else None)
+
+
+def _create_table_version_trigger():
+    op.execute('''
+        CREATE TRIGGER show_bump_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON show
+        FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version()
+    ''')
+
+
+def upgrade():
+    op.execute('ALTER TABLE show RENAME TO show_unpartitioned')
+    op.execute('ALTER INDEX show_pkey RENAME TO show_unpartitioned_pkey')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY NONE')
+    for name, _, _, _ in INDEXES:
+        op.drop_index(name, 'show_unpartitioned')
+
+    op.execute('''
+        CREATE TABLE show (
+            id integer NOT NULL DEFAULT nextval('show_id_seq'),
+            venue_id integer NOT NULL,
+            artist_id integer NOT NULL,
+            start_time timestamp with time zone NOT NULL,
+            end_time timestamp with time zone NOT NULL,
+            is_past boolean NOT NULL DEFAULT false,
+            version integer NOT NULL DEFAULT 1,
+            updated_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT show_pkey PRIMARY KEY (id, start_time),
+            CONSTRAINT show_venue_id_fkey FOREIGN KEY (venue_id) REFERENCES venue (id) ON DELETE CASCADE,
+            CONSTRAINT show_artist_id_fkey FOREIGN KEY (artist_id) REFERENCES artist (id) ON DELETE CASCADE,
+            CONSTRAINT show_end_time_after_start_time CHECK (end_time > start_time),
+            -- Bookings near a month boundary are checked against the neighbouring partition
+            -- for overlaps this long (booking.BOUNDARY_MARGIN)
+            CONSTRAINT show_max_duration CHECK (end_time - start_time <= interval '1 day')
+        ) PARTITION BY RANGE (start_time)
+    ''')
+    op.execute(CREATE_SHOW_PARTITION)
+    op.execute(f'''
+        SELECT create_show_partition(month::date)
+        FROM (SELECT min(start_time) AS first, max(start_time) AS last FROM show_unpartitioned) AS bounds,
+             generate_series(date_trunc('month', coalesce(first, now()) AT TIME ZONE 'UTC'),
+                             greatest(last, now()) AT TIME ZONE 'UTC' + interval '{MONTHS_AHEAD} months',
+                             interval '1 month') AS month
+    ''')
+    op.execute(f'INSERT INTO show ({COLUMNS}) SELECT {COLUMNS} FROM show_unpartitioned')
+    op.drop_table('show_unpartitioned')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY show.id')
+    _create_indexes()
+    _create_table_version_trigger()
+
+    op.create_table('show_archive',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('venue_id', sa.Integer(), nullable=False),
+                    sa.Column('artist_id', sa.Integer(), nullable=False),
+                    sa.Column('start_time', sa.DateTime(timezone=True), nullable=False),
+                    sa.Column('end_time', sa.DateTime(timezone=True), nullable=False),
+                    sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ondelete='CASCADE'),
+                    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_show_archive_venue_id_start_time', 'show_archive', ['venue_id', 'start_time'])
+    op.create_index('ix_show_archive_artist_id_start_time', 'show_archive', ['artist_id', 'start_time'])
+    op.execute('ANALYZE show')
+
+
+def downgrade():
+    op.execute('ALTER TABLE show RENAME TO show_partitioned')
+    op.execute('ALTER INDEX show_pkey RENAME TO show_partitioned_pkey')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY NONE')
+    for name, _, _, _ in INDEXES:
+        op.drop_index(name, 'show_partitioned')
+
+    op.execute('''
+        CREATE TABLE show (
+            id integer NOT NULL DEFAULT nextval('show_id_seq'),
+            venue_id integer NOT NULL,
+            artist_id integer NOT NULL,
+            start_time timestamp with time zone NOT NULL,
+            end_time timestamp with time zone NOT NULL,
+            is_past boolean NOT NULL DEFAULT false,
+            version integer NOT NULL DEFAULT 1,
+            updated_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT show_pkey PRIMARY KEY (id),
+            CONSTRAINT show_venue_id_fkey FOREIGN KEY (venue_id) REFERENCES venue (id) ON DELETE CASCADE,
+            CONSTRAINT show_artist_id_fkey FOREIGN KEY (artist_id) REFERENCES artist (id) ON DELETE CASCADE,
+            CONSTRAINT show_end_time_after_start_time CHECK (end_time > start_time)
+        )
+    ''')
+    op.execute(f'INSERT INTO show ({COLUMNS}) SELECT {COLUMNS} FROM show_partitioned')
+    op.execute('''
+        INSERT INTO show (id, venue_id, artist_id, start_time, end_time, is_past)
+        SELECT id, venue_id, artist_id, start_time, end_time, true FROM show_archive
+    ''')
+    op.drop_table('show_archive')
+    op.drop_table('show_partitioned')
+    op.execute('DROP FUNCTION create_show_partition(date)')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY show.id')
+    _create_indexes()
+    for name, column in EXCLUSIONS:
+        op.execute(f'ALTER TABLE show ADD CONSTRAINT {name.format(table="show")} '
+                   f'EXCLUDE USING gist ({column} WITH =, tstzrange(start_time, end_time) WITH &&)')
+    op.execute('''
+        CREATE TRIGGER show_bump_row_version BEFORE UPDATE ON show
+        FOR EACH ROW EXECUTE PROCEDURE bump_row_version()
+    ''')
+    _create_table_version_trigger()
@@ -0,0 +1,43 @@
+"""Denormalized show counters
+
+Revision ID: 8a4f0b3c9d21
+Revises: 5d2c8e1f4a7b
+Create Date: 2026-10-18 11:02:17.544930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4f0b3c9d21'
+down_revision = '5d2c8e1f4a7b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('show', sa.Column('is_past', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    op.execute('UPDATE show SET is_past = start_time < now()')
+    for table, foreign_key in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        op.execute(f'''
+            UPDATE {table} SET
+                upcoming_shows_count = counts.upcoming,
+                past_shows_count = counts.past
+            FROM (SELECT {foreign_key} AS id,
+                         count(*) FILTER (WHERE NOT is_past) AS upcoming,
+                         count(*) FILTER (WHERE is_past) AS past
+                  FROM show GROUP BY {foreign_key}) AS counts
+            WHERE {table}.id = counts.id
+        ''')
+
+
+def downgrade():
+    op.drop_column('show', 'is_past')
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
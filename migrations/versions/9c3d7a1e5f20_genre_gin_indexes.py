@@ -0,0 +1,35 @@
+"""Genre GIN indexes
+
+Revision ID: 9c3d7a1e5f20
+Revises: 6e1a9d4b7f35
+Create Date: 2026-10-18 21:47:12.503318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3d7a1e5f20'
+down_revision = '6e1a9d4b7f35'
+branch_labels = None
+depends_on = None
+
+# Genre filters (genres @> ARRAY[...]) on the venue and artist listings
+INDEXES = [
+    ('ix_venue_genres', 'venue', 'genres'),
+    ('ix_artist_genres', 'artist', 'genres'),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(name, table, [column], postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
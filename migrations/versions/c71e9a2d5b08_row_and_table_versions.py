@@ -0,0 +1,73 @@
+"""Row and table versions for conditional GETs
+
+Revision ID: c71e9a2d5b08
+Revises: 8a4f0b3c9d21
+Create Date: 2026-10-18 13:40:55.192734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71e9a2d5b08'
+down_revision = '8a4f0b3c9d21'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist', 'show')
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+                                       server_default=sa.func.now()))
+
+    op.create_table('table_version',
+                    sa.Column('name', sa.String(length=63), nullable=False),
+                    sa.Column('version', sa.BigInteger(), nullable=False, server_default='1'),
+                    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+                              server_default=sa.func.now()),
+                    sa.PrimaryKeyConstraint('name')
+                    )
+    op.execute("INSERT INTO table_version (name) VALUES ('venue'), ('artist'), ('show')")
+
+    op.execute('''
+        CREATE FUNCTION bump_row_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    op.execute('''
+        CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_version SET version = version + 1, updated_at = now() WHERE name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    for table in TABLES:
+        op.execute(f'''
+            CREATE TRIGGER {table}_bump_row_version BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE PROCEDURE bump_row_version()
+        ''')
+        op.execute(f'''
+            CREATE TRIGGER {table}_bump_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version()
+        ''')
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER {table}_bump_table_version ON {table}')
+        op.execute(f'DROP TRIGGER {table}_bump_row_version ON {table}')
+    op.execute('DROP FUNCTION bump_table_version()')
+    op.execute('DROP FUNCTION bump_row_version()')
+    op.drop_table('table_version')
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
@@ -0,0 +1,127 @@
+"""Table versions bumped only by statements that change rows, striped over slots
+
+Revision ID: d84f1b6e2a57
+Revises: 9c3d7a1e5f20
+Create Date: 2026-10-19 09:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd84f1b6e2a57'
+down_revision = '9c3d7a1e5f20'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist', 'show')
+# Rows per table a write statement may bump, picked by backend pid, so concurrent writers
+# rarely wait on each other's row lock; a table's version is the sum over its slots
+SLOTS = 16
+
+# Transition tables can only be declared on single-event triggers
+TRIGGERS = [
+    ('insert', 'INSERT', 'REFERENCING NEW TABLE AS new_rows'),
+    ('update', 'UPDATE', 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    ('delete', 'DELETE', 'REFERENCING OLD TABLE AS old_rows'),
+    ('truncate', 'TRUNCATE', ''),
+]
+
+BUMP_ROW_VERSION = '''
+    CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+    BEGIN
+        -- Updates that change nothing (counter repairs, re-saved forms) keep the row's version
+        IF NEW IS NOT DISTINCT FROM OLD THEN
+            RETURN NEW;
+        END IF;
+        NEW.version := OLD.version + 1;
+        NEW.updated_at := now();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+'''
+
+BUMP_TABLE_VERSION = f'''
+    CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+    DECLARE
+        changed boolean;
+    BEGIN
+        -- Each branch only plans the transition tables its trigger declares
+        IF TG_OP = 'INSERT' THEN
+            changed := EXISTS (SELECT 1 FROM new_rows);
+        ELSIF TG_OP = 'DELETE' THEN
+            changed := EXISTS (SELECT 1 FROM old_rows);
+        ELSIF TG_OP = 'UPDATE' THEN
+            -- bump_row_version left the rows that did not change at their version
+            changed := EXISTS (SELECT 1 FROM new_rows JOIN old_rows USING (id)
+                               WHERE new_rows.version <> old_rows.version);
+        ELSE
+            changed := true;
+        END IF;
+        IF changed THEN
+            INSERT INTO table_version AS current (name, slot) VALUES (TG_TABLE_NAME, pg_backend_pid() % {SLOTS})
+            ON CONFLICT (name, slot) DO UPDATE SET version = current.version + 1, updated_at = now();
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+'''
+
+# As created by c71e9a2d5b08
+PREVIOUS_BUMP_ROW_VERSION = '''
+    CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := OLD.version + 1;
+        NEW.updated_at := now();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+'''
+
+PREVIOUS_BUMP_TABLE_VERSION = '''
+    CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE table_version SET version = version + 1, updated_at = now() WHERE name = TG_TABLE_NAME;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+'''
+
+
+def upgrade():
+    op.add_column('table_version', sa.Column('slot', sa.SmallInteger(), nullable=False, server_default='0'))
+    op.drop_constraint('table_version_pkey', 'table_version', type_='primary')
+    op.create_primary_key('table_version_pkey', 'table_version', ['name', 'slot'])
+
+    op.execute(BUMP_ROW_VERSION)
+    op.execute(BUMP_TABLE_VERSION)
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER {table}_bump_table_version ON {table}')
+        for suffix, event, referencing in TRIGGERS:
+            op.execute(f'''
+                CREATE TRIGGER {table}_bump_table_version_{suffix} AFTER {event} ON {table}
+                {referencing} FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version()
+            ''')
+
+
+def downgrade():
+    for table in TABLES:
+        for suffix, _, _ in TRIGGERS:
+            op.execute(f'DROP TRIGGER {table}_bump_table_version_{suffix} ON {table}')
+        op.execute(f'''
+            CREATE TRIGGER {table}_bump_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version()
+        ''')
+    op.execute(PREVIOUS_BUMP_TABLE_VERSION)
+    op.execute(PREVIOUS_BUMP_ROW_VERSION)
+
+    # Fold the slots back into one row per table
+    op.execute('''
+        INSERT INTO table_version (name, slot, version, updated_at)
+        SELECT name, -1, sum(version), max(updated_at) FROM table_version GROUP BY name
+    ''')
+    op.execute('DELETE FROM table_version WHERE slot <> -1')
+    op.drop_constraint('table_version_pkey', 'table_version', type_='primary')
+    op.drop_column('table_version', 'slot')
+    op.create_primary_key('table_version_pkey', 'table_version', ['name'])
@@ -0,0 +1,45 @@
+"""Composite show and area indexes
+
+Revision ID: e3b57f6a1c92
+Revises: c71e9a2d5b08
+Create Date: 2026-10-18 15:21:03.877410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b57f6a1c92'
+down_revision = 'c71e9a2d5b08'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    # Detail pages, per-row counts and ETags, deleting a venue or artist
+    ('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'], None),
+    ('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'], None),
+    # Keyset pagination of the shows feed
+    ('ix_show_start_time_id', 'show', ['start_time', 'id'], None),
+    # Counter roll-forward only ever looks at shows not yet counted as past
+    ('ix_show_start_time_upcoming', 'show', ['start_time'], 'NOT is_past'),
+    # Area listing order and "City, ST" searches
+    ('ix_venue_state_city_name', 'venue', ['state', 'city', 'name', 'id'], None),
+    ('ix_artist_state_city', 'artist', ['state', 'city'], None),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(name, table, columns,
+                            postgresql_concurrently=True,
+                            postgresql_where=sa.text(where) if where else None)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""Cascade show foreign keys
+
+Revision ID: f4a9c3e7b210
+Revises: e3b57f6a1c92
+Create Date: 2026-10-18 18:02:47.519306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a9c3e7b210'
+down_revision = 'e3b57f6a1c92'
+branch_labels = None
+depends_on = None
+
+# (constraint, column, referenced table)
+FOREIGN_KEYS = [
+    ('show_venue_id_fkey', 'venue_id', 'venue'),
+    ('show_artist_id_fkey', 'artist_id', 'artist'),
+]
+
+
+def _recreate(on_delete):
+    # Swapping the constraint NOT VALID only locks show briefly; the existing rows are
+    # checked afterwards by VALIDATE CONSTRAINT, which does not block reads or writes.
+    for name, column, table in FOREIGN_KEYS:
+        op.execute(f'ALTER TABLE show DROP CONSTRAINT {name}, '
+                   f'ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {table} (id) {on_delete} NOT VALID')
+    with op.get_context().autocommit_block():
+        for name, _, _ in FOREIGN_KEYS:
+            op.execute(f'ALTER TABLE show VALIDATE CONSTRAINT {name}')
+
+
+def upgrade():
+    _recreate('ON DELETE CASCADE')
+
+
+def downgrade():
+    _recreate('')
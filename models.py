@@ -1,14 +1,39 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from math import ceil
+from sqlalchemy.sql.util import ClauseAdapter
+import formatting
 from config import db
+from readmodels import EntityRow, FeedRow, projection, fetch
+
+PAST_SHOWS_PER_PAGE = 12
+SHOWS_PER_PAGE = 30
+DEFAULT_SHOW_DURATION = timedelta(hours=2)
+# Enforced by the show_max_duration constraint; booking relies on it to find overlaps across partitions
+MAX_SHOW_DURATION = timedelta(days=1)
+
+
+def _default_end_time(context):
+    return context.get_current_parameters()['start_time'] + DEFAULT_SHOW_DURATION
 
 
 class Show(db.Model):
+    # Partitioned by month on start_time, so the database's primary key is (id, start_time);
+    # ids still come from one sequence and stay unique. Old partitions move to show_archive.
     __tablename__ = 'show'
 
     id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
     start_time = db.Column(db.DateTime(timezone=True), nullable=False)
+    # Shows of one venue, or of one artist, may not overlap: see the show_*_during_excl constraints
+    end_time = db.Column(db.DateTime(timezone=True), nullable=False, default=_default_end_time)
+    # Whether the show is counted in past_shows_count rather than upcoming_shows_count
+    is_past = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Bumped by the bump_row_version trigger on every UPDATE
+    version = db.Column(db.Integer, nullable=False, server_default='1', server_onupdate=db.FetchedValue())
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), server_onupdate=db.FetchedValue())
 
     def __repr__(self):
         return f'<Show id: {self.id}>'
@@ -22,9 +47,307 @@ class Show(db.Model):
             'artist_id': self.artist_id,
             'artist_name': self.artist.name,
             'artist_image_link': self.artist.image_link,
-            'start_time': self.start_time
+            'start_time': self.start_time,
+            'end_time': self.end_time
         }
 
+    @classmethod
+    def get_feed(cls, after=None, start=None, end=None, limit=SHOWS_PER_PAGE):
+        """
+        One page of the shows feed ordered by (start_time, id), joined with artist and venue columns.
+        ``after`` is the (start_time, id) keyset position of the previous page's last show.
+        Returns the page and the position to continue from, or None on the last page.
+        """
+        query = projection(FeedRow, cls.id, cls.start_time, cls.venue_id, Venue.name,
+                           cls.artist_id, Artist.name, Artist.image_link) \
+            .join(Venue, Venue.id == cls.venue_id) \
+            .join(Artist, Artist.id == cls.artist_id)
+        if start is not None:
+            query = query.filter(cls.start_time >= start)
+        if end is not None:
+            query = query.filter(cls.start_time < end)
+        if after is not None:
+            query = query.filter(db.tuple_(cls.start_time, cls.id) > db.tuple_(*after))
+        rows = fetch(query.order_by(cls.start_time, cls.id).limit(limit + 1), FeedRow)
+        page = rows[:limit]
+        displays = formatting.format_many([row.start_time for row in page], formatting.SHOW_TIME_FORMAT)
+        page = [row._replace(start_time_display=display) for row, display in zip(page, displays)]
+        next_position = (page[-1].start_time, page[-1].id) if len(rows) > limit else None
+        return page, next_position
+
+    # ------------------------------------------------------------------------#
+    # Denormalized show counters on Venue and Artist.
+    # ------------------------------------------------------------------------#
+
+    def add_to_counters(self):
+        """Counts this new show on its venue and artist, as past or upcoming depending on its start time."""
+        self.is_past = self.start_time < datetime.now(timezone.utc)
+        column = 'past_shows_count' if self.is_past else 'upcoming_shows_count'
+        for model, id in ((Venue, self.venue_id), (Artist, self.artist_id)):
+            model.query.filter_by(id=id).update({column: getattr(model, column) + 1}, synchronize_session=False)
+
+    @classmethod
+    def remove_from_counters(cls, criterion, counterpart):
+        """
+        Uncounts the shows matching ``criterion`` from the counterpart rows they are counted on,
+        ahead of deleting them. One grouped UPDATE regardless of how many shows match.
+        """
+        shows = _with_archive()
+        foreign_key = shows.c[f'{counterpart.__tablename__}_id']
+        counts = db.session.query(foreign_key.label('id'),
+                                  db.func.count().filter(db.not_(shows.c.is_past)).label('upcoming'),
+                                  db.func.count().filter(shows.c.is_past).label('past')) \
+            .filter(ClauseAdapter(shows).traverse(criterion)) \
+            .group_by(foreign_key) \
+            .subquery()
+        table = counterpart.__table__
+        db.session.execute(table.update()
+                           .where(table.c.id == counts.c.id)
+                           .values(upcoming_shows_count=table.c.upcoming_shows_count - counts.c.upcoming,
+                                   past_shows_count=table.c.past_shows_count - counts.c.past))
+
+    @classmethod
+    def roll_forward(cls):
+        """Moves shows that have started since the last run from the upcoming to the past counters."""
+        return db.session.execute(ROLL_FORWARD_SQL).scalar()
+
+    @classmethod
+    def repair_counters(cls):
+        """Recomputes every show counter from the show and show_archive tables."""
+        for statement in REPAIR_COUNTERS_SQL:
+            db.session.execute(statement)
+
+    @classmethod
+    def count_by_time(cls, criterion, now):
+        """Counts upcoming and past shows matching ``criterion``, archived ones included, in one query."""
+        past = _with_archive(cls.start_time < now)
+        upcoming_count = db.session.query(db.func.count(cls.id)) \
+            .filter(criterion, cls.start_time >= now) \
+            .as_scalar()
+        past_count = db.session.query(db.func.count()) \
+            .select_from(past) \
+            .filter(ClauseAdapter(past).traverse(criterion)) \
+            .as_scalar()
+        return db.session.query(upcoming_count.label('upcoming'), past_count.label('past')).one()
+
+    @classmethod
+    def get_upcoming(cls, criterion, counterpart, now):
+        """
+        Upcoming shows matching ``criterion``, soonest first, joined with the counterpart's name and image.
+        The start_time bound prunes the scan to the current and future month partitions.
+        """
+        query = cls._query_with_counterpart(criterion, counterpart, cls.__table__) \
+            .filter(cls.start_time >= now) \
+            .order_by(cls.start_time, cls.id)
+        return [row._asdict() for row in query]
+
+    @classmethod
+    def get_past(cls, criterion, counterpart, now, page=1, per_page=PAST_SHOWS_PER_PAGE):
+        """One page of past shows matching ``criterion``, archived ones included, most recent first."""
+        past = _with_archive(cls.start_time < now)
+        query = cls._query_with_counterpart(criterion, counterpart, past) \
+            .order_by(past.c.start_time.desc(), past.c.id.desc()) \
+            .offset((page - 1) * per_page) \
+            .limit(per_page)
+        return [row._asdict() for row in query]
+
+    @classmethod
+    def _query_with_counterpart(cls, criterion, counterpart, source):
+        prefix = counterpart.__tablename__
+        foreign_key = source.c[f'{prefix}_id']
+        return db.session.query(source.c.id,
+                                source.c.start_time,
+                                foreign_key.label(f'{prefix}_id'),
+                                counterpart.name.label(f'{prefix}_name'),
+                                counterpart.image_link.label(f'{prefix}_image_link')) \
+            .select_from(source) \
+            .join(counterpart, counterpart.id == foreign_key) \
+            .filter(ClauseAdapter(source).traverse(criterion))
+
+
+class ArchivedShow(db.Model):
+    """Shows of the month partitions archived by partitions.archive_partitions, all of them past."""
+    __tablename__ = 'show_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
+    start_time = db.Column(db.DateTime(timezone=True), nullable=False)
+    end_time = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f'<ArchivedShow id: {self.id}>'
+
+
+def _with_archive(*criteria):
+    """
+    The shows matching ``criteria`` together with every archived show, as one selectable with
+    the columns of show. Criteria written against Show are adapted to it with ClauseAdapter;
+    PostgreSQL pushes them down into both halves of the UNION ALL, so each uses its indexes.
+    """
+    live = db.select([Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.is_past])
+    for criterion in criteria:
+        live = live.where(criterion)
+    archived = db.select([ArchivedShow.id, ArchivedShow.venue_id, ArchivedShow.artist_id,
+                          ArchivedShow.start_time, db.true().label('is_past')])
+    return db.union_all(live, archived).alias('any_show')
+
+
+ROLL_FORWARD_SQL = db.text("""
+    WITH rolled AS (
+        UPDATE show SET is_past = true
+        WHERE NOT is_past AND start_time < now()
+        RETURNING venue_id, artist_id
+    ), venues AS (
+        UPDATE venue SET upcoming_shows_count = upcoming_shows_count - rolled_venue.count,
+                         past_shows_count = past_shows_count + rolled_venue.count
+        FROM (SELECT venue_id, count(*) FROM rolled GROUP BY venue_id) AS rolled_venue
+        WHERE venue.id = rolled_venue.venue_id
+    ), artists AS (
+        UPDATE artist SET upcoming_shows_count = upcoming_shows_count - rolled_artist.count,
+                          past_shows_count = past_shows_count + rolled_artist.count
+        FROM (SELECT artist_id, count(*) FROM rolled GROUP BY artist_id) AS rolled_artist
+        WHERE artist.id = rolled_artist.artist_id
+    )
+    SELECT count(*) FROM rolled
+""")
+
+REPAIR_COUNTERS_SQL = [db.text(statement) for statement in (
+    """
+    UPDATE show SET is_past = start_time < now()
+    WHERE is_past IS DISTINCT FROM (start_time < now())
+    """,
+    """
+    UPDATE venue SET
+        upcoming_shows_count = (SELECT count(*) FROM show WHERE show.venue_id = venue.id AND NOT show.is_past),
+        past_shows_count = (SELECT count(*) FROM show WHERE show.venue_id = venue.id AND show.is_past)
+                         + (SELECT count(*) FROM show_archive WHERE show_archive.venue_id = venue.id)
+    """,
+    """
+    UPDATE artist SET
+        upcoming_shows_count = (SELECT count(*) FROM show WHERE show.artist_id = artist.id AND NOT show.is_past),
+        past_shows_count = (SELECT count(*) FROM show WHERE show.artist_id = artist.id AND show.is_past)
+                         + (SELECT count(*) FROM show_archive WHERE show_archive.artist_id = artist.id)
+    """,
+)]
+
+
+def _get_detail_version(model, id, counterpart):
+    """
+    Everything a venue or artist detail page depends on, fetched without loading the page data:
+    the row's version, the counterpart table's version (names and images shown per show),
+    how many of its shows are upcoming right now and when the latest past show started.
+    """
+    now = datetime.now(timezone.utc)
+    foreign_key = getattr(Show, f'{model.__tablename__}_id')
+    upcoming = db.session.query(db.func.count(Show.id)) \
+        .filter(foreign_key == model.id, Show.start_time >= now) \
+        .correlate(model) \
+        .as_scalar()
+    last_started = db.session.query(db.func.max(Show.start_time)) \
+        .filter(foreign_key == model.id, Show.start_time < now) \
+        .correlate(model) \
+        .as_scalar()
+    counterpart_updated_at = db.session.query(db.func.max(TableVersion.updated_at)) \
+        .filter(TableVersion.name == counterpart.__tablename__) \
+        .as_scalar()
+    return db.session.query(model.version,
+                            model.updated_at,
+                            TableVersion.total(counterpart.__tablename__).label('counterpart_version'),
+                            counterpart_updated_at.label('counterpart_updated_at'),
+                            upcoming.label('upcoming'),
+                            last_started.label('last_started')) \
+        .filter(model.id == id) \
+        .first()
+
+
+def _delete_many(model, ids, counterpart):
+    """
+    Deletes the venues or artists with ``ids`` in one statement, their shows going with them through
+    ON DELETE CASCADE, after uncounting those shows from the counterpart rows in one more.
+    Nothing is loaded into the session. Returns the ids that existed and were deleted.
+    """
+    foreign_key = getattr(Show, f'{model.__tablename__}_id')
+    Show.remove_from_counters(foreign_key.in_(ids), counterpart)
+    table = model.__table__
+    deleted = db.session.execute(table.delete().where(table.c.id.in_(ids)).returning(table.c.id))
+    return [row.id for row in deleted]
+
+
+# ----------------------------------------------------------------------------#
+# Genre and area browsing.
+# ----------------------------------------------------------------------------#
+
+# Every row contributes one facet row per genre plus one for its area, so a single GROUP BY
+# counts both facets: genre rows have a NULL area and area rows a NULL genre
+FACETS_SQL = """
+    SELECT facet.genre, facet.city, facet.state, count(*) AS count
+    FROM {table}
+    CROSS JOIN LATERAL (
+        SELECT genre, NULL, NULL FROM unnest({table}.genres) AS genre
+        UNION ALL
+        SELECT NULL, {table}.city, {table}.state
+    ) AS facet (genre, city, state)
+    WHERE {where}
+    GROUP BY facet.genre, facet.city, facet.state
+    ORDER BY count(*) DESC, facet.genre, facet.state, facet.city
+"""
+
+
+def _browse_filter(model, genres=(), city=None, state=None):
+    """
+    The WHERE clause selecting the venues or artists with every one of ``genres`` in ``city`` and
+    ``state``, as SQL text and parameters. ``genres @>`` is answered by the GIN index on genres.
+    """
+    table = model.__tablename__
+    conditions, parameters = ['true'], {}
+    if genres:
+        conditions.append(f'{table}.genres @> CAST(:genres AS varchar[])')
+        parameters['genres'] = list(genres)
+    if city:
+        conditions.append(f'{table}.city = :city')
+        parameters['city'] = city
+    if state:
+        conditions.append(f'{table}.state = :state')
+        parameters['state'] = state
+    return ' AND '.join(conditions), parameters
+
+
+def _get_facets(model, **filters):
+    """Genre and area counts of the rows matching ``filters``, most common first, plus their total."""
+    where, parameters = _browse_filter(model, **filters)
+    rows = db.session.execute(db.text(FACETS_SQL.format(table=model.__tablename__, where=where)), parameters)
+    genres, areas = [], []
+    for row in rows:
+        if row.genre is not None:
+            genres.append({'genre': row.genre, 'count': row.count})
+        else:
+            areas.append({'city': row.city, 'state': row.state, 'count': row.count})
+    return {'genres': genres, 'areas': areas, 'total': sum(area['count'] for area in areas)}
+
+
+def _serialize_shows(criterion, counterpart, past_page):
+    """Partitions the shows matching ``criterion`` into upcoming and a page of past shows in SQL."""
+    now = datetime.now(timezone.utc)
+    counts = Show.count_by_time(criterion, now)
+    past_pages = ceil(counts.past / PAST_SHOWS_PER_PAGE)
+    past_page = max(1, min(past_page, past_pages))
+    past_shows = Show.get_past(criterion, counterpart, now, page=past_page)
+    upcoming_shows = Show.get_upcoming(criterion, counterpart, now)
+    # Formats every start time on the page at once, for the templates to render as they are
+    shows = upcoming_shows + past_shows
+    for show, display in zip(shows, formatting.format_many([show['start_time'] for show in shows],
+                                                           formatting.SHOW_TIME_FORMAT)):
+        show['start_time_display'] = display
+    return {
+        'past_shows': past_shows,
+        'past_shows_count': counts.past,
+        'past_shows_page': past_page,
+        'past_shows_pages': past_pages,
+        'upcoming_shows': upcoming_shows,
+        'upcoming_shows_count': counts.upcoming
+    }
+
 
 class Venue(db.Model):
     __tablename__ = 'venue'
@@ -41,15 +364,24 @@ class Venue(db.Model):
     website = db.Column(db.String(120), nullable=True)
     seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(500), nullable=True)
-    shows = db.relationship("Show", cascade="all, delete", backref="venue")
+    # Maintained by Show.add_to_counters, Show.remove_from_counters and Show.roll_forward
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by the bump_row_version trigger on every UPDATE
+    version = db.Column(db.Integer, nullable=False, server_default='1', server_onupdate=db.FetchedValue())
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), server_onupdate=db.FetchedValue())
+    # Shows are deleted by the database (ON DELETE CASCADE), never loaded just to be deleted
+    shows = db.relationship("Show", cascade="all, delete", passive_deletes=True, backref="venue")
 
     def __repr__(self):
         return f'<Venue id: {self.id}, name: {self.name}>'
 
     @property
     def serialize(self):
-        past_shows = self._get_past_shows()
-        upcoming_shows = self._get_upcoming_shows()
+        return self.serialize_detail()
+
+    def serialize_detail(self, past_page=1):
         return {
             'id': self.id,
             'name': self.name,
@@ -63,10 +395,7 @@ class Venue(db.Model):
             'website': self.website,
             'seeking_talent': self.seeking_talent,
             'seeking_description': self.seeking_description,
-            'past_shows': past_shows,
-            'past_shows_count': len(past_shows),
-            'upcoming_shows': upcoming_shows,
-            'upcoming_shows_count': len(upcoming_shows)
+            **_serialize_shows(Show.venue_id == self.id, Artist, past_page)
         }
 
     @property
@@ -74,26 +403,36 @@ class Venue(db.Model):
         return {
             'id': self.id,
             'name': self.name,
-            'num_upcoming_shows': len(self._get_upcoming_shows())
+            'num_upcoming_shows': self.upcoming_shows_count
         }
 
-    @property
-    def serialize_by_city_and_state(self):
-        return {
-            'city': self.city,
-            'state': self.state,
-            'venues': self._get_venues_by_city_and_state()
-        }
+    @classmethod
+    def get_detail_version(cls, id):
+        return _get_detail_version(cls, id, Artist)
 
-    def _get_upcoming_shows(self):
-        return list(filter(lambda s: s.start_time >= datetime.now(timezone.utc), self.shows))
+    @classmethod
+    def delete_many(cls, ids):
+        return _delete_many(cls, ids, Artist)
 
-    def _get_past_shows(self):
-        return list(filter(lambda s: s.start_time < datetime.now(timezone.utc), self.shows))
+    @classmethod
+    def get_facets(cls, **filters):
+        return _get_facets(cls, **filters)
 
-    def _get_venues_by_city_and_state(self):
-        venues = Venue.query.filter_by(city=self.city, state=self.state).all()
-        return [venue.serialize_by_name_id for venue in venues]
+    @classmethod
+    def get_areas(cls, genres=(), city=None, state=None, limit=None):
+        """Groups the venues matching the filters (every venue by default) by their (city, state) area in a single query."""
+        where, parameters = _browse_filter(cls, genres, city, state)
+        rows = db.session.query(cls.city, cls.state, cls.id, cls.name,
+                                cls.upcoming_shows_count.label('num_upcoming_shows')) \
+            .filter(db.text(where).bindparams(**parameters)) \
+            .order_by(cls.state, cls.city, cls.name, cls.id) \
+            .limit(limit) \
+            .all()
+        return [{
+            'city': city,
+            'state': state,
+            'venues': [EntityRow(row.id, row.name, row.num_upcoming_shows) for row in venues]
+        } for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state))]
 
 
 class Artist(db.Model):
@@ -110,15 +449,24 @@ class Artist(db.Model):
     website = db.Column(db.String(120), nullable=True)
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(500), nullable=True)
-    shows = db.relationship("Show", cascade="all, delete", backref="artist")
+    # Maintained by Show.add_to_counters, Show.remove_from_counters and Show.roll_forward
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by the bump_row_version trigger on every UPDATE
+    version = db.Column(db.Integer, nullable=False, server_default='1', server_onupdate=db.FetchedValue())
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), server_onupdate=db.FetchedValue())
+    # Shows are deleted by the database (ON DELETE CASCADE), never loaded just to be deleted
+    shows = db.relationship("Show", cascade="all, delete", passive_deletes=True, backref="artist")
 
     def __repr__(self):
         return f'<Artist id: {self.id}, name: {self.name}>'
 
     @property
     def serialize(self):
-        past_shows = self._get_past_shows()
-        upcoming_shows = self._get_upcoming_shows()
+        return self.serialize_detail()
+
+    def serialize_detail(self, past_page=1):
         return {
             'id': self.id,
             'name': self.name,
@@ -131,10 +479,7 @@ class Artist(db.Model):
             'website': self.website,
             'seeking_venue': self.seeking_venue,
             'seeking_description': self.seeking_description,
-            'past_shows': past_shows,
-            'past_shows_count': len(past_shows),
-            'upcoming_shows': upcoming_shows,
-            'upcoming_shows_count': len(upcoming_shows)
+            **_serialize_shows(Show.artist_id == self.id, Venue, past_page)
         }
 
     @property
@@ -142,11 +487,65 @@ class Artist(db.Model):
         return {
             'id': self.id,
             'name': self.name,
-            'num_upcoming_shows': len(self._get_upcoming_shows())
+            'num_upcoming_shows': self.upcoming_shows_count
         }
 
-    def _get_upcoming_shows(self):
-        return list(filter(lambda s: s.start_time >= datetime.now(timezone.utc), self.shows))
+    @classmethod
+    def get_detail_version(cls, id):
+        return _get_detail_version(cls, id, Venue)
+
+    @classmethod
+    def get_facets(cls, **filters):
+        return _get_facets(cls, **filters)
+
+    @classmethod
+    def get_listing(cls, genres=(), city=None, state=None, limit=None):
+        """The id, name and upcoming show count of the artists matching the filters, in id order."""
+        where, parameters = _browse_filter(cls, genres, city, state)
+        query = projection(EntityRow, cls.id, cls.name, cls.upcoming_shows_count) \
+            .filter(db.text(where).bindparams(**parameters)) \
+            .order_by(cls.id) \
+            .limit(limit)
+        return fetch(query, EntityRow)
+
+    @classmethod
+    def delete_many(cls, ids):
+        return _delete_many(cls, ids, Venue)
+
+
+class TableVersion(db.Model):
+    """
+    Per-table write counter, bumped by the bump_table_version trigger after every statement that
+    changes rows. Each table's counter is striped over a few slots so concurrent writers rarely
+    wait on the same row; its version is the sum of its slots.
+    """
+    __tablename__ = 'table_version'
+
+    name = db.Column(db.String(63), primary_key=True)
+    slot = db.Column(db.SmallInteger, primary_key=True, server_default='0')
+    version = db.Column(db.BigInteger, nullable=False, server_default='1')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+    def __repr__(self):
+        return f'<TableVersion name: {self.name}, slot: {self.slot}, version: {self.version}>'
+
+    @classmethod
+    def total(cls, name):
+        """A scalar subquery of the version of table ``name``, NULL when it has no counter."""
+        return db.session.query(db.cast(db.func.sum(cls.version), db.BigInteger)) \
+            .filter(cls.name == name) \
+            .as_scalar()
 
-    def _get_past_shows(self):
-        return list(filter(lambda s: s.start_time < datetime.now(timezone.utc), self.shows))
+    @classmethod
+    def get(cls, *names):
+        """
+        The versions of ``names`` in order, and the latest time any of them changed, or None
+        when a table has no counter (e.g. a schema built with create_all rather than migrations).
+        """
+        rows = {row.name: row for row in db.session.query(
+            cls.name,
+            db.cast(db.func.sum(cls.version), db.BigInteger).label('version'),
+            db.func.max(cls.updated_at).label('updated_at')).filter(cls.name.in_(names)).group_by(cls.name)}
+        if len(rows) < len(set(names)):
+            return None
+        return tuple(rows[name].version for name in names), max(row.updated_at for row in rows.values())
@@ -0,0 +1,117 @@
+"""
+Maintenance of the month partitions of show.
+
+Shows are range-partitioned by month (UTC) on start_time, one ``show_YYYY_MM`` table per month,
+created by the create_show_partition SQL function. ensure_partitions creates them ahead of the
+bookings made into them; archive_partitions moves the shows of months long past into
+show_archive and drops their partitions, so the live table only holds recent history.
+"""
+import re
+from datetime import date, datetime, timezone
+from sqlalchemy.exc import OperationalError
+from config import db
+from models import Show, Venue, Artist
+
+# Months of partitions kept ready after the current one
+MONTHS_AHEAD = 12
+# Months of past partitions kept live before they are archived
+ARCHIVE_AFTER_MONTHS = 12
+# Longest wait for the brief exclusive lock on show a detach takes; readers queue behind the waiting request
+DETACH_LOCK_TIMEOUT = '5s'
+LOCK_NOT_AVAILABLE = '55P03'
+
+PARTITION_NAME = re.compile(r'^show_(\d{4})_(\d{2})$')
+
+LIST_PARTITIONS_SQL = db.text("""
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = 'show'::regclass
+""")
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _utc(month):
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def _this_month():
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def create_partition(month):
+    """Creates the partition for ``month`` (any date in it). Returns its name, or None if it already exists."""
+    return db.session.execute(db.text('SELECT create_show_partition(:month)'), {'month': month}).scalar()
+
+
+def ensure_partitions(months_ahead=MONTHS_AHEAD):
+    """Creates any missing partition from the current month to ``months_ahead`` months on. Returns the names created."""
+    this_month = _this_month()
+    created = [create_partition(_add_months(this_month, offset)) for offset in range(months_ahead + 1)]
+    db.session.commit()
+    return [name for name in created if name]
+
+
+def list_partitions():
+    """(first day of the month, table name) of every partition of show, oldest first."""
+    partitions = []
+    for (name,) in db.session.execute(LIST_PARTITIONS_SQL):
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def archive_partitions(older_than_months=ARCHIVE_AFTER_MONTHS, detach_only=False):
+    """
+    Copies the shows of months that ended more than ``older_than_months`` months ago into
+    show_archive, then detaches and drops their partitions, one transaction per partition.
+    Archived shows keep counting as past shows and stay on the detail pages.
+
+    The copy only locks the partition against writes; the exclusive lock on show that the
+    detach needs is taken last, so it is held for a moment rather than for the whole copy.
+    A partition whose detach cannot get that lock within DETACH_LOCK_TIMEOUT is left for the
+    next run, as are the partitions after it.
+
+    With ``detach_only`` the partitions are left behind as standalone tables (to be dumped and
+    dropped by hand) and their shows are uncounted instead. Returns the names handled.
+    """
+    cutoff = _add_months(_this_month(), -older_than_months)
+    # Archived shows are all counted as past, so the counters must agree first
+    Show.roll_forward()
+    db.session.commit()
+    handled = []
+    for month, name in list_partitions():
+        if month >= cutoff:
+            break
+        # Keeps the month's shows from changing between the copy (or uncount) and the detach
+        db.session.execute(db.text(f'LOCK TABLE {name} IN SHARE MODE'))
+        if detach_only:
+            in_month = db.and_(Show.start_time >= _utc(month), Show.start_time < _utc(_add_months(month, 1)))
+            Show.remove_from_counters(in_month, Venue)
+            Show.remove_from_counters(in_month, Artist)
+        else:
+            db.session.execute(db.text(f"""
+                INSERT INTO show_archive (id, venue_id, artist_id, start_time, end_time)
+                SELECT id, venue_id, artist_id, start_time, end_time FROM {name}
+            """))
+        db.session.execute(db.text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+        try:
+            db.session.execute(db.text(f'ALTER TABLE show DETACH PARTITION {name}'))
+        except OperationalError as e:
+            if getattr(e.orig, 'pgcode', None) != LOCK_NOT_AVAILABLE:
+                raise
+            db.session.rollback()
+            break
+        if not detach_only:
+            db.session.execute(db.text(f'DROP TABLE {name}'))
+        db.session.commit()
+        handled.append(name)
+    if handled and not detach_only:
+        db.session.execute(db.text('ANALYZE show_archive'))
+        db.session.commit()
+    return handled
@@ -0,0 +1,221 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from html import escape
+from flask import current_app, g, request, abort, jsonify, send_from_directory
+
+# ----------------------------------------------------------------------------#
+# On-demand sampling profiler.
+# ----------------------------------------------------------------------------#
+
+# Stack categories, checked from the most to the least specific
+CATEGORIES = ('sql', 'format_datetime', 'serialize', 'jinja', 'other')
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread every ``interval`` seconds into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            self.stacks[';'.join(_frame_name(frame) for frame in frames)] += 1
+            self.categories[_categorize(frames)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _frame_name(frame):
+    module = frame.f_globals.get('__name__') or os.path.basename(frame.f_code.co_filename)
+    return f'{module}:{frame.f_code.co_name}'
+
+
+def _categorize(frames):
+    found = set()
+    for frame in frames:
+        module = frame.f_globals.get('__name__') or ''
+        name = frame.f_code.co_name
+        if module.startswith(('sqlalchemy', 'psycopg2')):
+            found.add('sql')
+        elif name in ('format_datetime', 'format_many'):
+            found.add('format_datetime')
+        elif name.startswith('serialize') or module == 'models':
+            found.add('serialize')
+        elif module.startswith('jinja2') or frame.f_code.co_filename.endswith('.html'):
+            found.add('jinja')
+    return next((category for category in CATEGORIES if category in found), 'other')
+
+
+def init_app(app):
+    """
+    Profiles a PROFILE_SAMPLE_RATE fraction of requests, plus any request whose PROFILE_HEADER
+    carries PROFILE_SECRET. Each profile is written to PROFILE_DIR as collapsed stacks, a
+    flamegraph SVG and a JSON summary of time spent in SQL, format_datetime, serialize calls
+    and Jinja rendering. The captured profiles are listed at /_admin/profiles.
+    """
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+    app.config.setdefault('PROFILE_SECRET', None)
+    app.config.setdefault('PROFILE_HEADER', 'X-Profile-Token')
+    app.config.setdefault('PROFILE_INTERVAL', 0.001)
+    app.config.setdefault('PROFILE_DIR', os.path.join(app.root_path, 'profiles'))
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_stop_sampler)
+    app.add_url_rule('/_admin/profiles', 'list_profiles', list_profiles)
+    app.add_url_rule('/_admin/profiles/<path:filename>', 'get_profile', get_profile)
+
+
+def _wants_profile():
+    config = current_app.config
+    secret = config['PROFILE_SECRET']
+    if secret and request.headers.get(config['PROFILE_HEADER']) == secret:
+        return True
+    return random.random() < config['PROFILE_SAMPLE_RATE']
+
+
+def _start_profile():
+    if request.path.startswith('/_admin/') or not _wants_profile():
+        return
+    sampler = StackSampler(threading.get_ident(), current_app.config['PROFILE_INTERVAL'])
+    g.profile = (sampler, time.perf_counter())
+    sampler.start()
+
+
+def _stop_sampler(exception=None):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile[0].stop()
+
+
+def _finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    sampler, started = profile
+    sampler.stop()
+    directory = current_app.config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    endpoint = re.sub(r'\W+', '-', request.endpoint or 'unknown')
+    name = f'{datetime.now(timezone.utc):%Y%m%dT%H%M%S.%f}-{endpoint}'
+    samples = sum(sampler.stacks.values())
+    summary = {
+        'method': request.method,
+        'path': request.full_path,
+        'status': response.status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        'interval_ms': sampler.interval * 1000,
+        'samples': samples,
+        'categories': {category: {'samples': sampler.categories[category],
+                                  'share': sampler.categories[category] / samples if samples else 0.0}
+                       for category in CATEGORIES},
+    }
+    with open(os.path.join(directory, f'{name}.collapsed'), 'w') as collapsed:
+        collapsed.writelines(f'{stack} {count}\n' for stack, count in sampler.stacks.most_common())
+    with open(os.path.join(directory, f'{name}.svg'), 'w') as svg:
+        svg.write(render_flamegraph(sampler.stacks, title=f'{request.method} {request.full_path}'))
+    with open(os.path.join(directory, f'{name}.json'), 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+    response.headers['X-Profile'] = name
+    return response
+
+
+# ----------------------------------------------------------------------------#
+# Admin routes.
+# ----------------------------------------------------------------------------#
+
+def require_secret():
+    """Answers 404 unless the request carries PROFILE_SECRET, in the PROFILE_HEADER header or the ``token`` argument."""
+    config = current_app.config
+    secret = config['PROFILE_SECRET']
+    if not secret or secret not in (request.headers.get(config['PROFILE_HEADER']), request.args.get('token')):
+        abort(404)
+
+
+def list_profiles():
+    require_secret()
+    directory = current_app.config['PROFILE_DIR']
+    profiles = []
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory), reverse=True):
+            if filename.endswith('.json'):
+                name = filename[:-len('.json')]
+                with open(os.path.join(directory, filename)) as summary:
+                    profiles.append({'name': name,
+                                     'files': [f'{name}.collapsed', f'{name}.svg', filename],
+                                     **json.load(summary)})
+    return jsonify(profiles)
+
+
+def get_profile(filename):
+    require_secret()
+    return send_from_directory(current_app.config['PROFILE_DIR'], filename)
+
+
+# ----------------------------------------------------------------------------#
+# Flamegraph rendering.
+# ----------------------------------------------------------------------------#
+
+FRAME_HEIGHT = 16
+WIDTH = 1200
+
+
+def render_flamegraph(stacks, title=''):
+    """Renders collapsed stack counts as a self-contained flamegraph SVG."""
+    root = {'children': {}, 'count': 0}
+    for stack, count in stacks.items():
+        node = root
+        node['count'] += count
+        for frame in stack.split(';'):
+            node = node['children'].setdefault(frame, {'children': {}, 'count': 0})
+            node['count'] += count
+
+    rects = []
+    depth = [0]
+
+    def layout(node, x, level):
+        depth[0] = max(depth[0], level)
+        for frame, child in sorted(node['children'].items()):
+            width = child['count'] / max(root['count'], 1) * WIDTH
+            if width >= 0.5:
+                rects.append((frame, child['count'], x, level, width))
+                layout(child, x, level + 1)
+            x += width
+
+    layout(root, 0.0, 0)
+    height = (depth[0] + 2) * FRAME_HEIGHT
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{height}" '
+             f'font-family="monospace" font-size="11">',
+             f'<text x="4" y="12">{escape(title)} ({root["count"]} samples)</text>']
+    for frame, count, x, level, width in rects:
+        y = height - (level + 1) * FRAME_HEIGHT
+        hue = 10 + zlib.crc32(frame.split(':')[0].encode()) % 50
+        label = frame if len(frame) * 7 < width else frame[:max(0, int(width / 7) - 2)] + '..'
+        parts.append(f'<g><title>{escape(frame)} ({count} samples)</title>'
+                     f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FRAME_HEIGHT - 1}" '
+                     f'fill="hsl({hue}, 80%, 60%)"/>'
+                     f'<text x="{x + 2:.1f}" y="{y + 12}">{escape(label) if width > 20 else ""}</text></g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
@@ -0,0 +1,45 @@
+"""
+Read models: the rows the list, search and feed views render.
+
+They are fetched with column-projected queries straight into namedtuples, never through ORM
+instances, so a listing skips the unused columns (image links, descriptions), the identity
+map and attribute instrumentation. Rows are immutable and cost about as much memory as the
+tuple of their values; templates read their fields as attributes, like before.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from sqlalchemy import orm
+from config import db
+
+# A venue or artist in a listing or in search results
+EntityRow = namedtuple('EntityRow', 'id name num_upcoming_shows')
+
+# A show in the /shows feed; start_time_display is filled in after the fetch
+FeedRow = namedtuple('FeedRow', 'id start_time venue_id venue_name artist_id artist_name artist_image_link '
+                                'start_time_display', defaults=(None,))
+
+
+def projection(row_type, *columns):
+    """A session query selecting ``columns``, given in the order of ``row_type``'s fields and labelled after them."""
+    return db.session.query(*(column.label(name) for name, column in zip(row_type._fields, columns)))
+
+
+def fetch(query, row_type):
+    """Runs a query built by ``projection`` into a list of ``row_type`` rows; fields it does not select keep their default."""
+    return [row_type(*row) for row in query]
+
+
+@contextmanager
+def snapshot_session():
+    """
+    A session of its own on the primary whose queries all read one snapshot (REPEATABLE READ),
+    for loads spanning several queries. The snapshot is taken by its first query.
+    """
+    with db.engine.connect() as connection:
+        connection = connection.execution_options(isolation_level='REPEATABLE READ')
+        with connection.begin():
+            session = orm.Session(bind=connection)
+            try:
+                yield session
+            finally:
+                session.close()
@@ -0,0 +1,140 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, session, has_request_context, jsonify
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+from profiling import require_secret
+
+# ----------------------------------------------------------------------------#
+# Read-replica routing.
+# ----------------------------------------------------------------------------#
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(SignallingSession):
+    """Sends reads to the replica bind while a view marked with ``read_replica`` runs; flushes always go to the primary."""
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and _use_replica() and REPLICA_BIND in (self.app.config['SQLALCHEMY_BINDS'] or {}):
+            return self.db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def _use_replica():
+    return has_request_context() and g.get('use_replica', False)
+
+
+def reading_from_replica():
+    """Whether the current request's queries go to the replica."""
+    return _use_replica() and REPLICA_BIND in (current_app.config['SQLALCHEMY_BINDS'] or {})
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(db_session):
+    """
+    Pins the browser to the primary for a while after it writes, so the page it is
+    redirected to reads its own write even if the replica has not caught up yet.
+    Set on commit rather than flush, since writes made with session.execute or
+    query.update (bulk deletes, counter updates) never flush.
+    """
+    if has_request_context() and not _use_replica():
+        session['primary_until'] = time.time() + current_app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+
+
+def read_replica(view):
+    """Lets a read-only view run its queries against the replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = session.get('primary_until', 0) < time.time()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# ----------------------------------------------------------------------------#
+# Connection pool metrics.
+# ----------------------------------------------------------------------------#
+
+
+class MeteredQueuePool(QueuePool):
+    """A QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.wait_time += waited
+                self.max_wait_time = max(self.max_wait_time, waited)
+
+    def metrics(self):
+        capacity = self.size() + self._max_overflow
+        return {
+            'size': self.size(),
+            'max_overflow': self._max_overflow,
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': self.overflow(),
+            'utilization': self.checkedout() / capacity if capacity > 0 else None,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'mean_wait_ms': self.wait_time / self.checkouts * 1000 if self.checkouts else 0.0,
+            'max_wait_ms': self.max_wait_time * 1000,
+        }
+
+
+def init_app(app, db):
+    def pool_metrics():
+        require_secret()
+        return jsonify({name: engine.pool.metrics() for name, engine in engines(app, db).items()
+                        if isinstance(engine.pool, MeteredQueuePool)})
+    app.add_url_rule('/_metrics/pool', 'pool_metrics', pool_metrics)
+
+
+def engines(app, db):
+    """The primary engine and one engine per bind, by name."""
+    binds = [None] + list(app.config['SQLALCHEMY_BINDS'] or {})
+    return {bind or 'primary': db.get_engine(app, bind=bind) for bind in binds}
+
+
+def dispose_engines(app, db):
+    """Closes every pooled connection, e.g. before forking so workers never share a socket."""
+    for engine in engines(app, db).values():
+        engine.dispose()
+
+
+def warm_pool(app, db):
+    """Opens ``pool_size`` connections on every engine up front, so first requests do not pay for connecting."""
+    for engine in engines(app, db).values():
+        connections = []
+        try:
+            for _ in range(engine.pool.size()):
+                connections.append(engine.connect())
+        except SQLAlchemyError:
+            app.logger.exception('Could not warm the connection pool')
+        finally:
+            for connection in connections:
+                connection.close()
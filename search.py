@@ -0,0 +1,352 @@
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import defaultdict
+from flask import current_app
+from config import db
+from forms import GENRE_CHOICES
+from models import Venue, Artist
+from readmodels import EntityRow, projection, fetch, snapshot_session
+from utils import BackgroundRebuild
+
+
+def search_venues(term, limit=None):
+    limit = limit or current_app.config['SEARCH_RESULTS_LIMIT']
+    return get_backend().search_venues(term.strip(), limit)
+
+
+def search_artists(term, limit=None):
+    limit = limit or current_app.config['SEARCH_RESULTS_LIMIT']
+    return get_backend().search_artists(term.strip(), limit)
+
+
+def get_backend():
+    """Returns the backend selected by the SEARCH_BACKEND setting ('database' or 'memory')."""
+    name = current_app.config['SEARCH_BACKEND']
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise RuntimeError(f'Unknown SEARCH_BACKEND: {name}')
+
+
+class SearchBackend(ABC):
+    """
+    Interface of a search backend. Results are lists of readmodels.EntityRow
+    (id, name and num_upcoming_shows) of each match, best match first.
+    The write hooks let backends that keep their own copy of the data stay in sync.
+    """
+
+    @abstractmethod
+    def search_venues(self, term, limit):
+        pass
+
+    @abstractmethod
+    def search_artists(self, term, limit):
+        pass
+
+    def add_venue(self, venue):
+        pass
+
+    def remove_venue(self, venue_id):
+        pass
+
+    def add_artist(self, artist):
+        pass
+
+    def remove_artist(self, artist_id):
+        pass
+
+    def add_show(self, show):
+        pass
+
+
+# ----------------------------------------------------------------------------#
+# Database search.
+# ----------------------------------------------------------------------------#
+
+class DatabaseSearchBackend(SearchBackend):
+
+    def search_venues(self, term, limit):
+        return self._search(Venue, term, limit)
+
+    def search_artists(self, term, limit):
+        return self._search(Artist, term, limit)
+
+    @staticmethod
+    def _search(model, term, limit):
+        """
+        Returns the top ``limit`` rows of ``model`` matching ``term`` on name, city/state or genre,
+        ranked by trigram similarity. Fuzzy and substring matches are answered by the pg_trgm GIN
+        indexes, genre matches by array overlap with the known genres the term names.
+        A term of the form "City, ST" matches the area instead.
+        """
+        query = projection(EntityRow, model.id, model.name, model.upcoming_shows_count)
+
+        if not term:
+            return fetch(query.order_by(model.name, model.id).limit(limit), EntityRow)
+
+        city, _, state = (part.strip() for part in term.partition(','))
+        if state:
+            criterion = db.and_(db.func.upper(model.state) == state.upper(),
+                                db.or_(model.city.ilike(f'%{city}%'), model.city.op('%')(city)))
+            score = db.func.similarity(model.city, city)
+        else:
+            pattern = f'%{term}%'
+            conditions = [model.name.ilike(pattern), model.name.op('%>')(term),
+                          model.city.ilike(pattern), model.city.op('%')(term)]
+            genres = [genre for genre, _ in GENRE_CHOICES if term.lower() in genre.lower()]
+            if genres:
+                conditions.append(model.genres.op('&&')(genres))
+            criterion = db.or_(*conditions)
+            score = db.func.greatest(db.func.word_similarity(term, model.name),
+                                     db.func.similarity(model.city, term),
+                                     db.func.similarity(db.func.array_to_string(model.genres, ' '), term))
+
+        query = query.filter(criterion) \
+            .order_by(score.desc(), model.name, model.id) \
+            .limit(limit)
+        return fetch(query, EntityRow)
+
+
+# ----------------------------------------------------------------------------#
+# In-memory search.
+# ----------------------------------------------------------------------------#
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Field boosts applied to term frequencies, so a name match outranks a genre match.
+FIELD_WEIGHTS = {'name': 3.0, 'city': 1.5, 'state': 1.0, 'genres': 1.0}
+
+# Score multipliers for query tokens matched exactly, as a prefix, or with one typo.
+EXACT_MATCH, PREFIX_MATCH, FUZZY_MATCH = 1.0, 0.7, 0.5
+
+# Bounds on how far a single query token may expand.
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+MAX_EXPANSIONS = 50
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _deletes(token):
+    """The token itself plus every variant with one character deleted."""
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _within_one_edit(a, b):
+    """True if ``a`` and ``b`` differ by at most one insertion, deletion, substitution or transposition."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        transposed = a[i:i + 1] == b[i + 1:i + 2] and a[i + 1:i + 2] == b[i:i + 1]
+        return a[i + 1:] == b[i + 1:] or (transposed and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
+
+
+class InvertedIndex:
+    """
+    An inverted index over short documents with BM25 ranking.
+    Query tokens match indexed terms exactly, as a prefix, or within one edit;
+    typo candidates come from a deletion neighbourhood so no term scan is needed.
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._neighbours = defaultdict(set)
+        self._terms = []
+        self._terms_dirty = False
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._payloads = {}
+        self._total_length = 0.0
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def add(self, doc_id, fields, payload):
+        """Indexes ``fields`` (a mapping of field name to text) under ``doc_id``, replacing any previous version."""
+        frequencies = defaultdict(float)
+        for field, text in fields.items():
+            for token in tokenize(text):
+                frequencies[token] += FIELD_WEIGHTS.get(field, 1.0)
+        with self._lock:
+            self.remove(doc_id)
+            for token, frequency in frequencies.items():
+                if token not in self._postings:
+                    self._terms_dirty = True
+                    for variant in _deletes(token):
+                        self._neighbours[variant].add(token)
+                self._postings[token][doc_id] = frequency
+            length = sum(frequencies.values())
+            self._doc_terms[doc_id] = list(frequencies)
+            self._doc_lengths[doc_id] = length
+            self._payloads[doc_id] = payload
+            self._total_length += length
+
+    def remove(self, doc_id):
+        with self._lock:
+            if doc_id not in self._payloads:
+                return
+            for token in self._doc_terms.pop(doc_id):
+                postings = self._postings[token]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[token]
+                    self._terms_dirty = True
+                    for variant in _deletes(token):
+                        self._neighbours[variant].discard(token)
+                        if not self._neighbours[variant]:
+                            del self._neighbours[variant]
+            self._total_length -= self._doc_lengths.pop(doc_id)
+            del self._payloads[doc_id]
+
+    def payload(self, doc_id):
+        return self._payloads.get(doc_id)
+
+    def replace_payload(self, doc_id, payload):
+        with self._lock:
+            if doc_id in self._payloads:
+                self._payloads[doc_id] = payload
+
+    def search(self, text, limit):
+        with self._lock:
+            if not text.strip():
+                return sorted(self._payloads.values(), key=lambda payload: payload.name.lower())[:limit]
+            scores = defaultdict(float)
+            for token in tokenize(text):
+                best = {}
+                for term, weight in self._expand(token):
+                    idf = self._idf(term)
+                    for doc_id, frequency in self._postings[term].items():
+                        score = weight * idf * self._saturate(frequency, self._doc_lengths[doc_id])
+                        if score > best.get(doc_id, 0.0):
+                            best[doc_id] = score
+                for doc_id, score in best.items():
+                    scores[doc_id] += score
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], self._payloads[item[0]].name.lower()))
+            return [self._payloads[doc_id] for doc_id, _ in ranked[:limit]]
+
+    def _expand(self, token):
+        """Yields the indexed terms ``token`` matches, each with its match weight."""
+        matched = set()
+        if token in self._postings:
+            matched.add(token)
+            yield token, EXACT_MATCH
+        if len(token) >= MIN_PREFIX_LENGTH:
+            for term in self._prefixed(token):
+                if term not in matched:
+                    matched.add(term)
+                    yield term, PREFIX_MATCH
+        if len(token) >= MIN_FUZZY_LENGTH:
+            candidates = set()
+            for variant in _deletes(token):
+                candidates |= self._neighbours.get(variant, set())
+            for term in sorted(candidates - matched)[:MAX_EXPANSIONS]:
+                if _within_one_edit(token, term):
+                    yield term, FUZZY_MATCH
+
+    def _prefixed(self, prefix):
+        if self._terms_dirty:
+            self._terms = sorted(self._postings)
+            self._terms_dirty = False
+        start = bisect_left(self._terms, prefix)
+        for term in self._terms[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def _idf(self, term):
+        count = len(self._payloads)
+        frequency = len(self._postings[term])
+        return math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+
+    def _saturate(self, frequency, length):
+        average_length = self._total_length / len(self._payloads)
+        return frequency * (self.k1 + 1) / (frequency + self.k1 * (1 - self.b + self.b * length / average_length))
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Serves search from per-process inverted indexes over venue and artist names, cities and genres.
+    The indexes are built from the database once, kept current by the write hooks, and rebuilt in
+    the background once they are older than SEARCH_INDEX_MAX_AGE seconds, so writes handled by
+    other worker processes show up too; searches use the previous indexes meanwhile, and the
+    writes made during a rebuild are replayed onto the new indexes.
+    """
+
+    def __init__(self):
+        self.rebuild = BackgroundRebuild(self._load, 'search index', 'SEARCH_INDEX_MAX_AGE')
+
+    def search_venues(self, term, limit):
+        return self._indexes()['venues'].search(term, limit)
+
+    def search_artists(self, term, limit):
+        return self._indexes()['artists'].search(term, limit)
+
+    def add_venue(self, venue):
+        document = _document(venue)
+        self.rebuild.update(lambda indexes: indexes['venues'].add(*document))
+
+    def remove_venue(self, venue_id):
+        self.rebuild.update(lambda indexes: indexes['venues'].remove(venue_id))
+
+    def add_artist(self, artist):
+        document = _document(artist)
+        self.rebuild.update(lambda indexes: indexes['artists'].add(*document))
+
+    def remove_artist(self, artist_id):
+        self.rebuild.update(lambda indexes: indexes['artists'].remove(artist_id))
+
+    def add_show(self, show):
+        if show.is_past:
+            return
+        counted = (('venues', show.venue_id), ('artists', show.artist_id))
+
+        def count_upcoming(indexes):
+            for name, doc_id in counted:
+                payload = indexes[name].payload(doc_id)
+                if payload is not None:
+                    indexes[name].replace_payload(
+                        doc_id, payload._replace(num_upcoming_shows=payload.num_upcoming_shows + 1))
+        self.rebuild.update(count_upcoming)
+
+    def _indexes(self):
+        return self.rebuild.get(current_app._get_current_object())
+
+    @staticmethod
+    def _load():
+        indexes = {'venues': InvertedIndex(), 'artists': InvertedIndex()}
+        with snapshot_session() as session:
+            for name, model in (('venues', Venue), ('artists', Artist)):
+                rows = session.query(model.id, model.name, model.city, model.state, model.genres,
+                                     model.upcoming_shows_count).all()
+                for row in rows:
+                    indexes[name].add(*_document(row))
+        return indexes
+
+
+def _document(entity):
+    """The id, indexed fields and payload of a venue or artist, read up front for InvertedIndex.add."""
+    return entity.id, {
+        'name': entity.name,
+        'city': entity.city,
+        'state': entity.state,
+        'genres': ' '.join(entity.genres)
+    }, EntityRow(entity.id, entity.name, entity.upcoming_shows_count)
+
+BACKENDS = {
+    'database': DatabaseSearchBackend(),
+    'memory': InMemorySearchBackend(),
+}
@@ -28,3 +28,40 @@ function deleteArtist(e) {
       }
     })
 };
+
+// Suggests names from a typeahead endpoint as the user types, and fills in the
+// id field named by data-target while one of them is picked
+function attachTypeahead(input) {
+  const target = document.getElementById(input.dataset.target);
+  const list = document.getElementById(input.getAttribute('list'));
+  let matches = [];
+  let pending = null;
+  input.addEventListener('input', () => {
+    const picked = matches.find(match => match.label === input.value);
+    if (picked) {
+      target.value = picked.id;
+      return;
+    }
+    // Edited away from the picked name, so its id no longer applies
+    target.value = '';
+    clearTimeout(pending);
+    pending = setTimeout(() => {
+      fetch(`${input.dataset.typeahead}?q=${encodeURIComponent(input.value)}`)
+        .then(response => response.json())
+        .then(body => {
+          matches = body.data.map(match => ({
+            id: match.id,
+            label: `${match.name} (${match.city}, ${match.state}) #${match.id}`
+          }));
+          list.innerHTML = '';
+          matches.forEach(match => {
+            const option = document.createElement('option');
+            option.value = match.label;
+            list.appendChild(option);
+          });
+        })
+    }, 100);
+  });
+};
+
+document.querySelectorAll('[data-typeahead]').forEach(attachTypeahead);
@@ -0,0 +1,48 @@
+"""
+Fixtures of the tests that need PostgreSQL. They run against TEST_DATABASE_URL, a scratch
+database migrated to the latest revision, and are skipped when it is not set. Each test runs
+in one transaction that is rolled back afterwards, so the database is left as it was.
+"""
+import os
+import pytest
+
+# config reads DATABASE_URL when it is first imported
+if os.getenv('TEST_DATABASE_URL'):
+    os.environ['DATABASE_URL'] = os.environ['TEST_DATABASE_URL']
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not os.getenv('TEST_DATABASE_URL'):
+        pytest.skip('Set TEST_DATABASE_URL to a scratch database migrated to the latest revision')
+    from config import create_app
+    return create_app('development')
+
+
+@pytest.fixture
+def session(app):
+    from config import db
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+
+
+@pytest.fixture
+def venue(session):
+    from models import Venue
+    venue = Venue(name='Test Hall', city='Austin', state='TX', address='1 Main St', genres=['Jazz'],
+                  phone='555-555-5555', image_link='https://example.com/venue.png')
+    session.add(venue)
+    session.flush()
+    return venue
+
+
+@pytest.fixture
+def artist(session):
+    from models import Artist
+    artist = Artist(name='Test Quartet', city='Austin', state='TX', genres=['Jazz'],
+                    phone='555-555-5555', image_link='https://example.com/artist.png')
+    session.add(artist)
+    session.flush()
+    return artist
+
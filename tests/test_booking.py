@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from booking import book, _near_month_boundary, BookingConflict, BookingError, UnknownReference
+from models import Show
+from partitions import create_partition
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def next_week_at(hour):
+    day = datetime.now(timezone.utc).date() + timedelta(days=7)
+    return datetime(day.year, day.month, day.day, hour, tzinfo=timezone.utc)
+
+
+def new_show(venue, artist, start_time, end_time=None):
+    create_partition(start_time.date())
+    return Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time, end_time=end_time)
+
+
+def test_book_counts_the_show(session, venue, artist):
+    book(new_show(venue, artist, next_week_at(20)))
+    session.refresh(venue)
+    session.refresh(artist)
+    assert venue.upcoming_shows_count == artist.upcoming_shows_count == 1
+
+
+def test_overlapping_booking_reports_the_conflicting_show(session, venue, artist):
+    first = new_show(venue, artist, next_week_at(20))
+    book(first)
+    with pytest.raises(BookingConflict) as raised:
+        book(new_show(venue, artist, next_week_at(21)))
+    assert [conflict['id'] for conflict in raised.value.conflicts] == [first.id]
+    assert raised.value.conflicts[0]['booked_by'] == 'venue'
+    session.refresh(venue)
+    assert venue.upcoming_shows_count == 1
+
+
+def test_unknown_venue_or_artist(session, venue, artist):
+    show = new_show(venue, artist, next_week_at(20))
+    show.venue_id = -1
+    with pytest.raises(UnknownReference, match='no venue with id -1'):
+        book(show)
+    show = new_show(venue, artist, next_week_at(20))
+    show.artist_id = -1
+    with pytest.raises(UnknownReference, match='no artist with id -1'):
+        book(show)
+
+
+def test_shows_longer_than_a_day_are_refused(session, venue, artist):
+    start_time = next_week_at(20)
+    with pytest.raises(BookingError, match='longer than 24 hours'):
+        book(new_show(venue, artist, start_time, start_time + timedelta(hours=25)))
+
+
+def test_month_without_a_partition(session, venue, artist):
+    show = Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2999, 1, 1, 20, tzinfo=timezone.utc))
+    with pytest.raises(BookingError, match='cannot be booked for January 2999'):
+        book(show)
+
+
+@pytest.mark.parametrize('start, end, near', [
+    (utc(2026, 3, 15, 20), utc(2026, 3, 15, 23), False),
+    (utc(2026, 3, 1, 10), utc(2026, 3, 1, 12), True),
+    (utc(2026, 2, 28, 23), utc(2026, 3, 1, 1), True),
+    (utc(2026, 2, 27, 10), utc(2026, 2, 27, 12), False),
+    (utc(2026, 12, 31, 22), utc(2027, 1, 1, 2), True),
+])
+def test_near_month_boundary(start, end, near):
+    assert _near_month_boundary(start, end) == near
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from bulk import import_file
+from config import db
+from models import Venue, Artist
+from partitions import create_partition
+
+
+@pytest.fixture
+def committed(app):
+    """A venue and an artist committed for an import to see, deleted with their shows afterwards."""
+    with app.app_context():
+        venue = Venue(name='Import Hall', city='Austin', state='TX', address='1 Main St', genres=['Jazz'],
+                      phone='555-555-5555', image_link='https://example.com/venue.png')
+        artist = Artist(name='Import Quartet', city='Austin', state='TX', genres=['Jazz'],
+                        phone='555-555-5555', image_link='https://example.com/artist.png')
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        try:
+            yield venue, artist
+        finally:
+            db.session.rollback()
+            Venue.delete_many([venue.id])
+            Artist.delete_many([artist.id])
+            db.session.commit()
+
+
+def test_imported_shows_are_counted_batch_by_batch(committed, tmp_path):
+    venue, artist = committed
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    starts = [now + timedelta(days=3), now - timedelta(days=3), now + timedelta(days=6)]
+    for start_time in starts:
+        create_partition(start_time.date())
+    db.session.commit()
+    path = tmp_path / 'shows.csv'
+    path.write_text('venue_id,artist_id,start_time,end_time\n' + ''.join(
+        f'{venue.id},{artist.id},{start_time.isoformat()},{end_time}\n' for start_time, end_time in [
+            (starts[0], ''),
+            (starts[1], ''),
+            (starts[2], (starts[2] + timedelta(hours=30)).isoformat()),
+        ]))
+
+    importer = import_file('show', str(path), batch_size=1)
+
+    assert importer.imported == 2
+    assert [reason for _, reason, _ in importer.rejected] == ['longer than 24 hours']
+    for entity in (venue, artist):
+        db.session.refresh(entity)
+        assert (entity.upcoming_shows_count, entity.past_shows_count) == (1, 1)
@@ -0,0 +1,83 @@
+import cache
+from cache import LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_returns_what_was_set():
+    lru = LRUCache()
+    lru.set('a', 1)
+    assert lru.get('a') == 1
+    assert lru.get('b') is None
+    assert (lru.hits, lru.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert lru.get('a') == 1 and lru.get('c') == 3
+    assert lru.evictions == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    lru = LRUCache(ttl=60)
+    lru.set('a', 1)
+    clock.now += 59
+    assert lru.get('a') == 1
+    clock.now += 2
+    assert lru.get('a') is None
+    assert len(lru) == 0
+
+
+def test_invalidate_evicts_every_entry_with_the_tag():
+    lru = LRUCache()
+    lru.set('venue page', 1, tags={'venue:1', 'artist:2'})
+    lru.set('artist page', 2, tags={'artist:2'})
+    lru.set('other page', 3, tags={'artist:3'})
+    lru.invalidate('artist:2')
+    assert lru.get('venue page') is None and lru.get('artist page') is None
+    assert lru.get('other page') == 3
+    assert lru.invalidations == 2
+
+
+def test_replica_reads_are_not_stored_right_after_an_invalidation(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    lru = LRUCache(replica_lag=10)
+    lru.invalidate('venues')
+    lru.set('listing', 'old', tags={'venues'}, from_replica=True)
+    assert lru.get('listing') is None
+    lru.set('listing', 'new', tags={'venues'})
+    assert lru.get('listing') == 'new'
+    clock.now += 11
+    lru.set('listing', 'newer', tags={'venues'}, from_replica=True)
+    assert lru.get('listing') == 'newer'
+
+
+def test_values_read_before_an_invalidation_are_not_stored(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    lru = LRUCache()
+    read_at = clock()
+    clock.now += 1
+    lru.invalidate('venue:1')
+    lru.set('venue page', 'stale', tags={'venue:1'}, read_at=read_at)
+    lru.set('other page', 'fresh', tags={'venue:2'}, read_at=read_at)
+    assert lru.get('venue page') is None
+    assert lru.get('other page') == 'fresh'
+    clock.now += 120
+    lru.invalidate('venue:2')
+    lru.set('slow page', 'unknown', tags={'venue:3'}, read_at=read_at)
+    assert lru.get('slow page') is None
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+from models import Venue, Show
+from partitions import create_partition
+
+
+def add_show(session, venue, artist, start_time):
+    create_partition(start_time.date())
+    show = Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time)
+    session.add(show)
+    session.flush()
+    show.add_to_counters()
+    return show
+
+
+def counters(session, entity):
+    session.refresh(entity)
+    return entity.upcoming_shows_count, entity.past_shows_count
+
+
+def test_new_shows_are_counted_as_upcoming_or_past(session, venue, artist):
+    now = datetime.now(timezone.utc)
+    add_show(session, venue, artist, now + timedelta(days=2))
+    add_show(session, venue, artist, now + timedelta(days=3))
+    add_show(session, venue, artist, now - timedelta(days=2))
+    assert counters(session, venue) == (2, 1)
+    assert counters(session, artist) == (2, 1)
+
+
+def test_deleting_a_venue_uncounts_its_shows_from_their_artists(session, venue, artist):
+    now = datetime.now(timezone.utc)
+    add_show(session, venue, artist, now + timedelta(days=2))
+    add_show(session, venue, artist, now - timedelta(days=2))
+    assert Venue.delete_many([venue.id]) == [venue.id]
+    assert counters(session, artist) == (0, 0)
+
+
+def test_roll_forward_moves_started_shows_to_the_past(session, venue, artist):
+    start_time = datetime.now(timezone.utc) + timedelta(days=2)
+    show = add_show(session, venue, artist, start_time)
+    # As if the show had started since it was booked
+    create_partition((start_time - timedelta(days=4)).date())
+    session.execute(Show.__table__.update().where(Show.id == show.id)
+                    .values(start_time=Show.start_time - timedelta(days=4)))
+    assert Show.roll_forward() >= 1
+    assert counters(session, venue) == (0, 1)
+    assert counters(session, artist) == (0, 1)
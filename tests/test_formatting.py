@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+from formatting import DateTimeFormatter
+
+
+def test_formats_named_formats():
+    formatter = DateTimeFormatter('en_US')
+    assert formatter.format(datetime(2026, 3, 6, 20, 30, tzinfo=timezone.utc), 'full') == 'Friday March, 6, 2026 at 8:30PM'
+
+
+def test_renders_times_in_utc():
+    formatter = DateTimeFormatter('en_US')
+    eastern = datetime(2026, 3, 6, 15, 30, tzinfo=timezone(timedelta(hours=-5)))
+    assert formatter.format(eastern, 'full') == formatter.format(datetime(2026, 3, 6, 20, 30), 'full')
+    assert formatter.format('2026-03-06T20:30:00+00:00', 'full') == 'Friday March, 6, 2026 at 8:30PM'
+
+
+def test_format_many_keeps_order_and_formats_each_value_once():
+    formatter = DateTimeFormatter('en_US')
+    first, second = datetime(2026, 3, 6, 20, 30), datetime(2026, 3, 7, 21, 0)
+    formatted = formatter.format_many([first, second, first], 'full')
+    assert formatted[0] == formatted[2] != formatted[1]
+    assert formatter.format.cache_info().misses == 2
+
+
+def test_cache_is_bounded():
+    formatter = DateTimeFormatter('en_US', cache_size=2)
+    for hour in range(5):
+        formatter.format(datetime(2026, 3, 6, hour), 'medium')
+    assert formatter.format.cache_info().currsize == 2
@@ -0,0 +1,51 @@
+from collections import namedtuple
+import matchmaking
+from matchmaking import MatchIndex, Profile, VENUE, ARTIST
+from utils import BackgroundRebuild
+
+Artist = namedtuple('Artist', 'id name image_link city state genres past_shows_count seeking_venue')
+Show = namedtuple('Show', 'venue_id artist_id is_past')
+
+
+def profile(id, name, genres, past_shows=0, city='Austin'):
+    return Profile(id, name, None, city, 'TX', frozenset(genres), past_shows)
+
+
+def suggested(index, side, id):
+    return [match['id'] for match in index.suggest(side, id, 10)]
+
+
+def test_ranks_by_shared_genres_then_show_history():
+    index = MatchIndex([profile(1, 'Hall', {'Jazz', 'Blues'})],
+                       [profile(10, 'Duo', {'Jazz'}, past_shows=5), profile(11, 'Trio', {'Jazz', 'Blues'}),
+                        profile(12, 'Quartet', {'Jazz'}), profile(13, 'Elsewhere', {'Jazz'}, city='Dallas')],
+                       {(1, 12): 2})
+    assert suggested(index, VENUE, 1) == [11, 12, 10]
+    assert index.suggest(VENUE, 1, 10)[0]['shared_genres'] == ['Blues', 'Jazz']
+    assert suggested(index, ARTIST, 13) == []
+
+
+def test_incremental_updates():
+    index = MatchIndex([profile(1, 'Hall', {'Jazz'})], [profile(10, 'Duo', {'Jazz'}), profile(11, 'Trio', {'Jazz'})])
+    index.add_show(1, 11, True)
+    assert suggested(index, VENUE, 1) == [11, 10]
+    index.add(ARTIST, 11, None)
+    assert suggested(index, VENUE, 1) == [10]
+    index.remove(VENUE, 1)
+    assert suggested(index, ARTIST, 10) == []
+
+
+def test_writes_during_a_rebuild_are_kept(monkeypatch):
+    def load():
+        index = MatchIndex([profile(1, 'Hall', {'Jazz'})], [profile(10, 'Duo', {'Jazz'})])
+        # Committed after the profiles were read: one deleted, one created, a show played
+        matchmaking.remove_artist(10)
+        matchmaking.add_artist(Artist(11, 'Trio', None, 'Austin', 'TX', ['Jazz'], 0, True))
+        matchmaking.add_show(Show(1, 11, True))
+        return index
+
+    monkeypatch.setattr(matchmaking, 'rebuild', BackgroundRebuild(load, 'matchmaking index', 'MATCHMAKING_INDEX_MAX_AGE'))
+    matchmaking.rebuild.build()
+    matches = matchmaking.rebuild.index.suggest(VENUE, 1, 10)
+    assert [(match['id'], match['shows_together'], match['past_shows_count']) for match in matches] == [(11, 1, 1)]
+
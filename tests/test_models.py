@@ -0,0 +1,12 @@
+from models import Venue, Artist, _browse_filter
+
+
+def test_browse_filter_without_filters_matches_everything():
+    assert _browse_filter(Venue) == ('true', {})
+
+
+def test_browse_filter_combines_genres_city_and_state():
+    where, parameters = _browse_filter(Artist, genres=['Jazz', 'Blues'], city='Austin', state='TX')
+    assert where == ('true AND artist.genres @> CAST(:genres AS varchar[]) '
+                     'AND artist.city = :city AND artist.state = :state')
+    assert parameters == {'genres': ['Jazz', 'Blues'], 'city': 'Austin', 'state': 'TX'}
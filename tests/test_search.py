@@ -0,0 +1,77 @@
+from collections import namedtuple
+from models import Venue
+from readmodels import EntityRow
+from search import InMemorySearchBackend, InvertedIndex, _within_one_edit
+from utils import BackgroundRebuild
+
+Payload = namedtuple('Payload', 'id name')
+
+
+def build(*documents):
+    index = InvertedIndex()
+    for id, name, city, genres in documents:
+        index.add(id, {'name': name, 'city': city, 'state': 'CA', 'genres': genres}, Payload(id, name))
+    return index
+
+
+def ids(results):
+    return [result.id for result in results]
+
+
+def test_matches_exact_prefix_and_one_typo():
+    index = build((1, 'The Velvet Lounge', 'San Francisco', 'Jazz'))
+    assert ids(index.search('velvet', 10)) == [1]
+    assert ids(index.search('velv', 10)) == [1]
+    assert ids(index.search('vlevet', 10)) == [1]
+    assert index.search('trombone', 10) == []
+
+
+def test_name_matches_outrank_genre_matches():
+    index = build((1, 'Blue Room', 'Oakland', 'Jazz'),
+                  (2, 'Jazz Corner', 'Oakland', 'Folk'))
+    assert ids(index.search('jazz', 10)) == [2, 1]
+
+
+def test_remove_and_replace():
+    index = build((1, 'Velvet Lounge', 'San Jose', 'Jazz'), (2, 'Park Stage', 'San Jose', 'Rock'))
+    index.remove(1)
+    assert index.search('velvet', 10) == []
+    index.add(2, {'name': 'Velvet Park'}, Payload(2, 'Velvet Park'))
+    assert ids(index.search('velvet', 10)) == [2]
+    assert index.search('stage', 10) == []
+    assert len(index) == 1
+
+
+def test_empty_term_lists_by_name():
+    index = build((1, 'zebra', 'Napa', 'Rock'), (2, 'Apple', 'Napa', 'Rock'))
+    assert ids(index.search(' ', 10)) == [2, 1]
+
+
+def test_replace_payload_keeps_the_postings():
+    index = build((1, 'Velvet Lounge', 'San Jose', 'Jazz'))
+    index.replace_payload(1, Payload(1, 'renamed'))
+    assert index.search('velvet', 10) == [Payload(1, 'renamed')]
+
+
+def test_within_one_edit():
+    assert _within_one_edit('jazz', 'jaz')
+    assert _within_one_edit('jazz', 'jazs')
+    assert _within_one_edit('jazz', 'jzaz')
+    assert not _within_one_edit('jazz', 'jz')
+
+
+def test_writes_during_a_rebuild_are_kept():
+    backend = InMemorySearchBackend()
+    venue = Venue(id=2, name='Velvet Room', city='Reno', state='NV', genres=['Jazz'], upcoming_shows_count=0)
+
+    def load():
+        indexes = {'venues': InvertedIndex(), 'artists': InvertedIndex()}
+        indexes['venues'].add(1, {'name': 'Velvet Lounge'}, EntityRow(1, 'Velvet Lounge', 0))
+        # Committed after the venues were read: one deleted, one created
+        backend.remove_venue(1)
+        backend.add_venue(venue)
+        return indexes
+
+    backend.rebuild = BackgroundRebuild(load, 'search index', 'SEARCH_INDEX_MAX_AGE')
+    backend.rebuild.build()
+    assert [row.id for row in backend.rebuild.index['venues'].search('velvet', 10)] == [2]
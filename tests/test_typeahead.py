@@ -0,0 +1,49 @@
+from collections import namedtuple
+import typeahead
+from typeahead import PrefixIndex
+from utils import BackgroundRebuild
+
+Row = namedtuple('Row', 'id name city state')
+
+
+def names(entries):
+    return [entry.name for entry in entries]
+
+
+def test_matches_the_start_of_any_word():
+    index = PrefixIndex([Row(1, 'The Blue Note', 'Boston', 'MA'), Row(2, 'Bluebird Cafe', 'Nashville', 'TN')])
+    assert names(index.search('blue', 10)) == ['The Blue Note', 'Bluebird Cafe']
+    assert names(index.search('NOTE', 10)) == ['The Blue Note']
+    assert index.search('lue', 10) == []
+    assert index.search('  ', 10) == []
+
+
+def test_each_entry_is_returned_once_up_to_the_limit():
+    index = PrefixIndex([Row(1, 'Jazz Jazz Jazz', 'Austin', 'TX'), Row(2, 'Jazz Hall', 'Austin', 'TX'),
+                         Row(3, 'Jazzy', 'Austin', 'TX')])
+    assert sorted(entry.id for entry in index.search('jazz', 10)) == [1, 2, 3]
+    assert len(index.search('jazz', 2)) == 2
+
+
+def test_add_replaces_and_remove_forgets():
+    index = PrefixIndex([Row(1, 'Old Name', 'Austin', 'TX')])
+    index.add(Row(1, 'New Name', 'Austin', 'TX'))
+    assert index.search('old', 10) == []
+    assert index.search('new', 10)[0].serialize() == {'id': 1, 'name': 'New Name', 'city': 'Austin', 'state': 'TX'}
+    index.remove(1)
+    index.remove(1)
+    assert index.search('name', 10) == []
+    assert len(index) == 0
+
+
+def test_writes_during_a_rebuild_are_kept(monkeypatch):
+    def load():
+        indexes = {'venues': PrefixIndex([Row(1, 'Old Hall', 'Austin', 'TX')]), 'artists': PrefixIndex()}
+        # Committed after the venues were read: one deleted, one created
+        typeahead.remove('venues', 1)
+        typeahead.add('venues', Row(2, 'New Hall', 'Austin', 'TX'))
+        return indexes
+
+    monkeypatch.setattr(typeahead, 'rebuild', BackgroundRebuild(load, 'typeahead indexes', 'TYPEAHEAD_INDEX_MAX_AGE'))
+    typeahead.rebuild.build()
+    assert names(typeahead.rebuild.index['venues'].search('hall', 10)) == ['New Hall']
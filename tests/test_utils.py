@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+import pytest
+from utils import encode_cursor, decode_cursor, parse_datetime, BackgroundRebuild
+
+
+def test_cursor_round_trip():
+    start_time = datetime(2026, 3, 6, 20, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(start_time, 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (start_time, 42)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not a cursor', encode_cursor(datetime(2026, 1, 1), 1)[:-3]])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_parse_datetime_treats_naive_values_as_utc():
+    assert parse_datetime('2026-03-06 20:30') == datetime(2026, 3, 6, 20, 30, tzinfo=timezone.utc)
+
+
+def test_rebuild_replays_the_changes_made_while_it_loads():
+    loads = []
+
+    def load():
+        loads.append(1)
+        index = {'loaded'}
+        if len(loads) == 2:
+            # A write hook running after the tables were read
+            rebuild.update(lambda index: index.add('written'))
+        return index
+
+    rebuild = BackgroundRebuild(load, 'test index', 'TEST_INDEX_MAX_AGE')
+    rebuild.update(lambda index: index.add('never built'))
+    rebuild.build()
+    assert rebuild.index == {'loaded'}
+    rebuild.build()
+    assert rebuild.index == {'loaded', 'written'}
+    rebuild.build()
+    assert rebuild.index == {'loaded'}
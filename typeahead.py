@@ -0,0 +1,123 @@
+"""
+Typeahead over venue and artist names, for picking them in the show form.
+
+Each name is indexed under every word it contains, so "note" finds "The Blue Note". Keys are
+held in one sorted list next to an array of ids, so a lookup is a bisect plus a short scan
+and an index of a million names stays a few compact arrays rather than a million dicts.
+The indexes are built when the web server starts (or on first use), kept current by the
+write hooks and rebuilt in the background once they are older than TYPEAHEAD_INDEX_MAX_AGE
+seconds, so writes handled by other worker processes show up too. Writes made during a
+rebuild are replayed onto the new indexes.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from flask import current_app
+from models import Venue, Artist
+from readmodels import snapshot_session
+from utils import BackgroundRebuild
+
+# Sorted keys scanned per result wanted, to skip duplicate ids (one per word of a name)
+SCAN_FACTOR = 8
+
+
+def get_index(name):
+    """The 'venues' or 'artists' index."""
+    return rebuild.get(current_app._get_current_object())[name]
+
+
+def add(name, entity):
+    """Indexes a saved venue or artist in the ``name`` index."""
+    entry = Entry(entity.id, entity.name, entity.city, entity.state)
+    rebuild.update(lambda indexes: indexes[name].add(entry))
+
+
+def remove(name, id):
+    rebuild.update(lambda indexes: indexes[name].remove(id))
+
+
+def _load():
+    with snapshot_session() as session:
+        return {name: PrefixIndex(session.query(model.id, model.name, model.city, model.state))
+                for name, model in (('venues', Venue), ('artists', Artist))}
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def _keys(name):
+    """The name from each of its words on: 'blue note' -> 'blue note', 'note'."""
+    words = normalize(name).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class Entry:
+    __slots__ = ('id', 'name', 'city', 'state')
+
+    def __init__(self, id, name, city, state):
+        self.id = id
+        self.name = name
+        self.city = city
+        self.state = state
+
+    def serialize(self):
+        return {'id': self.id, 'name': self.name, 'city': self.city, 'state': self.state}
+
+
+class PrefixIndex:
+    """Sorted name keys with a parallel array of the ids they belong to."""
+    __slots__ = ('_lock', '_keys', '_ids', '_entries')
+
+    def __init__(self, rows=()):
+        self._lock = threading.RLock()
+        self._entries = {row.id: Entry(row.id, row.name, row.city, row.state) for row in rows}
+        pairs = sorted((key, id) for id, entry in self._entries.items() for key in _keys(entry.name))
+        self._keys = [key for key, _ in pairs]
+        self._ids = array('q', (id for _, id in pairs))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entity):
+        """Indexes ``entity`` (anything with id, name, city and state), replacing any previous version."""
+        with self._lock:
+            self.remove(entity.id)
+            self._entries[entity.id] = Entry(entity.id, entity.name, entity.city, entity.state)
+            for key in _keys(entity.name):
+                position = bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._ids.insert(position, entity.id)
+
+    def remove(self, id):
+        with self._lock:
+            entry = self._entries.pop(id, None)
+            if entry is None:
+                return
+            for key in _keys(entry.name):
+                position = bisect_left(self._keys, key)
+                while self._ids[position] != id:
+                    position += 1
+                del self._keys[position]
+                del self._ids[position]
+
+    def search(self, prefix, limit):
+        """Up to ``limit`` entries with a word-start matching ``prefix``, in key order."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            position = bisect_left(self._keys, prefix)
+            end = min(len(self._keys), position + limit * SCAN_FACTOR)
+            found = []
+            seen = set()
+            while position < end and len(found) < limit and self._keys[position].startswith(prefix):
+                id = self._ids[position]
+                if id not in seen:
+                    seen.add(id)
+                    found.append(self._entries[id])
+                position += 1
+            return found
+
+
+rebuild = BackgroundRebuild(_load, 'typeahead indexes', 'TYPEAHEAD_INDEX_MAX_AGE')
@@ -1,19 +1,131 @@
+import base64
+import threading
+import time
 import dateutil.parser
-import babel
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 # ----------------------------------------------------------------------------#
-# Filters.
+# Dates.
 # ----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-    date = value
-    if type(value) != datetime:
-        date = dateutil.parser.parse(value)
+def parse_datetime(value):
+    """Parses a user supplied date/time, treating naive values as UTC."""
+    date = dateutil.parser.parse(value)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
 
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+
+# ----------------------------------------------------------------------------#
+# Keyset cursors.
+# ----------------------------------------------------------------------------#
+
+def encode_cursor(start_time, id):
+    """Encodes a (start_time, id) keyset position as an opaque url-safe token."""
+    raw = f'{start_time.isoformat()}|{id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodes a token produced by ``encode_cursor``. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        start_time, id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(start_time), int(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+# ----------------------------------------------------------------------------#
+# Background rebuilds.
+# ----------------------------------------------------------------------------#
+
+class BackgroundRebuild:
+    """
+    Holds a per-process in-memory index that ``load`` builds from the database. ``get`` builds it
+    on first use and, once it is older than the ``max_age_setting`` config value (seconds),
+    rebuilds it in a daemon thread, one rebuild at a time, while requests keep using the current
+    one. Write hooks change the index through ``update``. Failed rebuilds are logged and retried.
+
+    Changes made while a build is loading are recorded and replayed onto the new index before it
+    is swapped in, so a write committed after the load read its rows is not lost. Replayed adds
+    and removes are idempotent; a count bumped by a write that committed just before the load's
+    snapshot may be counted twice until the next rebuild.
+    """
+
+    def __init__(self, load, description, max_age_setting):
+        self._load = load
+        self._description = description
+        self._max_age_setting = max_age_setting
+        self._lock = threading.RLock()
+        self._running = threading.Lock()
+        # One list of changes per build in progress
+        self._journals = []
+        self.index = None
+        self.built_at = None
+
+    def get(self, app):
+        """The index, built now if it never was, with a background rebuild started once it is stale."""
+        if self.built_at is None:
+            self.build()
+        elif time.monotonic() - self.built_at > app.config[self._max_age_setting]:
+            self.start(app)
+        return self.index
+
+    def build(self):
+        """Loads a new index and swaps it in, with the changes made meanwhile replayed onto it."""
+        journal = []
+        with self._lock:
+            self._journals.append(journal)
+        try:
+            index = self._load()
+            with self._lock:
+                for change in journal:
+                    change(index)
+                self.index = index
+                self.built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._journals = [other for other in self._journals if other is not journal]
+
+    def warm(self, app):
+        """Builds the index up front; if the database is unavailable it is built on first use instead."""
+        with app.app_context():
+            try:
+                self.build()
+            except Exception:
+                app.logger.exception(f'Could not build the {self._description}, it will be built on first use')
+
+    def update(self, change):
+        """
+        Applies ``change``, a function of the index, unless the index was never built, and records
+        it for the builds in progress. Changes must only use values read up front, since they may
+        run after the write's session is closed.
+        """
+        with self._lock:
+            if self.index is not None:
+                change(self.index)
+            for journal in self._journals:
+                journal.append(change)
+
+    def start(self, app):
+        """Starts a rebuild unless one is already running. Returns whether it started."""
+        if not self._running.acquire(blocking=False):
+            return False
+        try:
+            threading.Thread(target=self._run, args=(app,), name=f'rebuild {self._description}', daemon=True).start()
+        except BaseException:
+            self._running.release()
+            raise
+        return True
+
+    def _run(self, app):
+        try:
+            with app.app_context():
+                try:
+                    self.build()
+                except Exception:
+                    app.logger.exception(f'Could not rebuild the {self._description}')
+        finally:
+            self._running.release()
@@ -0,0 +1,498 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+from forms import ShowForm, VenueForm, ArtistForm
+from config import db
+from models import Venue, Artist, Show, TableVersion
+import booking
+import matchmaking
+import search
+import typeahead
+from cache import cached, add_cache_tags, response_cache
+from etags import conditional
+from replicas import read_replica
+from datetime import timedelta
+from utils import parse_datetime, encode_cursor, decode_cursor
+
+# The pages and forms; create_app registers them on the app
+blueprint = Blueprint('views', __name__)
+
+# ----------------------------------------------------------------------------#
+# Write hooks.
+# ----------------------------------------------------------------------------#
+
+
+def _on_venue_saved(venue):
+    search.get_backend().add_venue(venue)
+    matchmaking.add_venue(venue)
+    typeahead.add('venues', venue)
+    response_cache.invalidate(f'venue:{venue.id}', 'venues', 'shows')
+
+
+def _on_venue_deleted(venue_id):
+    search.get_backend().remove_venue(venue_id)
+    matchmaking.remove_venue(venue_id)
+    typeahead.remove('venues', venue_id)
+    # Its shows went with it, so the artists they were counted on changed too
+    response_cache.invalidate(f'venue:{venue_id}', 'venues', 'artists', 'shows')
+
+
+def _on_artist_saved(artist):
+    search.get_backend().add_artist(artist)
+    matchmaking.add_artist(artist)
+    typeahead.add('artists', artist)
+    response_cache.invalidate(f'artist:{artist.id}', 'artists', 'shows')
+
+
+def _on_artist_deleted(artist_id):
+    search.get_backend().remove_artist(artist_id)
+    matchmaking.remove_artist(artist_id)
+    typeahead.remove('artists', artist_id)
+    # Its shows went with it, so the venues they were counted on changed too
+    response_cache.invalidate(f'artist:{artist_id}', 'artists', 'venues', 'shows')
+
+
+def _on_show_saved(show):
+    search.get_backend().add_show(show)
+    matchmaking.add_show(show)
+    # The listings show each venue's and artist's upcoming show count
+    response_cache.invalidate(f'venue:{show.venue_id}', f'artist:{show.artist_id}', 'venues', 'artists', 'shows')
+
+
+def _after_commit(hook, *args):
+    """Runs a write hook once the write is committed; a failing hook is logged rather than reported as a failed write."""
+    try:
+        hook(*args)
+    except Exception:
+        current_app.logger.exception(f'{hook.__name__} failed, caches and indexes may be stale until they expire')
+
+# ----------------------------------------------------------------------------#
+# Conditional GET validators.
+# ----------------------------------------------------------------------------#
+
+
+def _table_validators(*names):
+    return lambda: TableVersion.get(*names)
+
+
+def _detail_validators(model):
+    def validators(**kwargs):
+        row = model.get_detail_version(*kwargs.values())
+        # A missing row 404s in the view; a missing counterpart counter means no ETag
+        if row is None or row.counterpart_version is None:
+            return None
+        last_modified = max(filter(None, (row.updated_at, row.counterpart_updated_at, row.last_started)))
+        return (row.version, row.counterpart_version, row.upcoming), last_modified
+    return validators
+
+
+def _browse_filters():
+    """The genre (repeatable), city and state filters of the venue and artist listings."""
+    return {
+        'genres': request.args.getlist('genre'),
+        'city': request.args.get('city') or None,
+        'state': request.args.get('state') or None,
+    }
+
+
+def _browse_limit(filters):
+    # The unfiltered listings show everything, as they always have
+    return current_app.config['BROWSE_RESULTS_LIMIT'] if any(filters.values()) else None
+
+# ----------------------------------------------------------------------------#
+# Controllers.
+# ----------------------------------------------------------------------------#
+
+
+@blueprint.route('/')
+def index():
+    return render_template('pages/home.html')
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues')
+@read_replica
+@conditional(_table_validators('venue'))
+@cached('venues')
+def venues():
+    filters = _browse_filters()
+    data = Venue.get_areas(**filters, limit=_browse_limit(filters))
+    facets = Venue.get_facets(**filters)
+    return render_template('pages/venues.html', areas=data, facets=facets, filters=filters)
+
+
+@blueprint.route('/venues/search', methods=['POST'])
+@read_replica
+def search_venues():
+    search_term = request.form.get('search_term', '')
+    venues = search.search_venues(search_term)
+    data = {
+        "count": len(venues),
+        "data": venues
+    }
+    return render_template('pages/search_venues.html', results=data, search_term=search_term)
+
+
+@blueprint.route('/venues/<int:venue_id>')
+@read_replica
+@conditional(_detail_validators(Venue))
+@cached('venue:{venue_id}')
+def show_venue(venue_id):
+    venue = Venue.query.filter_by(id=venue_id).first_or_404()
+    past_page = request.args.get('past_page', 1, type=int)
+    data = venue.serialize_detail(past_page)
+    add_cache_tags(*(f'artist:{show["artist_id"]}' for show in data['upcoming_shows'] + data['past_shows']))
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@blueprint.route('/venues/<int:venue_id>/matches')
+@read_replica
+def venue_matches(venue_id):
+    venue = Venue.query.filter_by(id=venue_id).first_or_404()
+    matches = matchmaking.suggest_artists(venue_id)
+    return render_template('pages/matches.html', entity=venue, seeking=venue.seeking_talent,
+                           entity_url=url_for('views.show_venue', venue_id=venue_id),
+                           matches=matches, match_endpoint='views.show_artist', match_key='artist_id')
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    form = VenueForm()
+    if form.validate_on_submit():
+        data = request.form
+        try:
+            is_seeking_talent = True if data['seeking_description'].strip() else False
+            venue = Venue(name=data['name'],
+                          city=data['city'],
+                          state=data['state'],
+                          address=data['address'],
+                          genres=request.form.getlist('genres'),
+                          phone=data['phone'],
+                          image_link=data['image_link'],
+                          facebook_link=data['facebook_link'],
+                          website=data['website'],
+                          seeking_talent=is_seeking_talent,
+                          seeking_description=data['seeking_description']
+                          )
+            db.session.add(venue)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            flash(f'An error occurred. Venue {data["name"]} could not be listed.')
+        else:
+            _after_commit(_on_venue_saved, venue)
+            flash(f'Venue {data["name"]} was successfully listed!')
+        finally:
+            db.session.close()
+        return render_template('pages/home.html')
+    # Flashing current errors
+    for input, errors in form.errors.items():
+        flash(f'Invalid value for "{input}". {"".join(errors)}')
+    return render_template('forms/new_venue.html', form=form)
+
+#  Venue Update
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    form = VenueForm()
+    venue = Venue.query.filter_by(id=venue_id).first_or_404()
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    form = VenueForm()
+
+    if form.validate_on_submit():
+        data = request.form
+        try:
+            is_seeking_talent = True if data['seeking_description'].strip() else False
+            venue = Venue.query.get(venue_id)
+            venue.name = data['name']
+            venue.city = data['city']
+            venue.state = data['state']
+            venue.address = data['address']
+            venue.genres = request.form.getlist('genres')
+            venue.phone = data['phone']
+            venue.image_link = data['image_link']
+            venue.facebook_link = data['facebook_link']
+            venue.website = data['website']
+            venue.seeking_talent = is_seeking_talent
+            venue.seeking_description = data['seeking_description']
+            db.session.commit()
+        except:
+            db.session.rollback()
+            flash(f'An error occurred. Venue {data["name"]} could not be edited.')
+        else:
+            _after_commit(_on_venue_saved, venue)
+            flash(f'Venue {data["name"]} was successfully edited!')
+        finally:
+            db.session.close()
+    # Flashing form validation errors
+    for input, errors in form.errors.items():
+        flash(f'Invalid value for "{input}". {"".join(errors)}')
+    return redirect(url_for('views.show_venue', venue_id=venue_id))
+
+#  Venue Delete
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/venues/<venue_id>/delete', methods=['DELETE'])
+def delete_venue(venue_id):
+    try:
+        deleted = Venue.delete_many([int(venue_id)])
+        if not deleted:
+            raise LookupError(f'No venue with id {venue_id}')
+        db.session.commit()
+    except:
+        db.session.rollback()
+        flash(f'An error occured. Venue with id {venue_id} could not be deleted')
+    else:
+        _after_commit(_on_venue_deleted, deleted[0])
+        flash(f'Venue with id {venue_id} was successfully deteled!')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+#  Artists
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists')
+@read_replica
+@conditional(_table_validators('artist'))
+@cached('artists')
+def artists():
+    filters = _browse_filters()
+    data = Artist.get_listing(**filters, limit=_browse_limit(filters))
+    facets = Artist.get_facets(**filters)
+    return render_template('pages/artists.html', artists=data, facets=facets, filters=filters)
+
+
+@blueprint.route('/artists/search', methods=['POST'])
+@read_replica
+def search_artists():
+    search_term = request.form.get('search_term', '')
+    artists = search.search_artists(search_term)
+    data = {
+        "count": len(artists),
+        "data": artists
+    }
+    return render_template('pages/search_artists.html', results=data, search_term=search_term)
+
+
+@blueprint.route('/artists/<int:artist_id>')
+@read_replica
+@conditional(_detail_validators(Artist))
+@cached('artist:{artist_id}')
+def show_artist(artist_id):
+    artist = Artist.query.filter_by(id=artist_id).first_or_404()
+    past_page = request.args.get('past_page', 1, type=int)
+    data = artist.serialize_detail(past_page)
+    add_cache_tags(*(f'venue:{show["venue_id"]}' for show in data['upcoming_shows'] + data['past_shows']))
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@blueprint.route('/artists/<int:artist_id>/matches')
+@read_replica
+def artist_matches(artist_id):
+    artist = Artist.query.filter_by(id=artist_id).first_or_404()
+    matches = matchmaking.suggest_venues(artist_id)
+    return render_template('pages/matches.html', entity=artist, seeking=artist.seeking_venue,
+                           entity_url=url_for('views.show_artist', artist_id=artist_id),
+                           matches=matches, match_endpoint='views.show_venue', match_key='venue_id')
+
+#  Artists Update
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    form = ArtistForm()
+    artist = Artist.query.filter_by(id=artist_id).first_or_404()
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    form = ArtistForm()
+
+    if form.validate_on_submit():
+        data = request.form
+        try:
+            is_seeking_venue = True if data['seeking_description'].strip() else False
+            artist = Artist.query.get(artist_id)
+            artist.name = data['name']
+            artist.city = data['city']
+            artist.state = data['state']
+            artist.genres = request.form.getlist('genres')
+            artist.phone = data['phone']
+            artist.image_link = data['image_link']
+            artist.facebook_link = data['facebook_link']
+            artist.website = data['website']
+            artist.seeking_venue = is_seeking_venue
+            artist.seeking_description = data['seeking_description']
+            db.session.commit()
+        except:
+            db.session.rollback()
+            flash(f'An error occurred. Artist {data["name"]} could not be edited.')
+        else:
+            _after_commit(_on_artist_saved, artist)
+            flash(f'Artist {data["name"]} was successfully edited!')
+        finally:
+            db.session.close()
+    # Flashing form validation errors
+    for input, errors in form.errors.items():
+        flash(f'Invalid value for "{input}". {"".join(errors)}')
+
+    return redirect(url_for('views.show_artist', artist_id=artist_id))
+
+#  Artists Create
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    form = ArtistForm()
+    if form.validate_on_submit():
+        data = request.form
+        try:
+            is_seeking_venue = True if data['seeking_description'].strip() else False
+            artist = Artist(name=data['name'],
+                            city=data['city'],
+                            state=data['state'],
+                            genres=request.form.getlist('genres'),
+                            phone=data['phone'],
+                            image_link=data['image_link'],
+                            facebook_link=data['facebook_link'],
+                            website=data['website'],
+                            seeking_venue=is_seeking_venue,
+                            seeking_description=data['seeking_description']
+                            )
+            db.session.add(artist)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            flash(f'An error occurred. Artist {data["name"]} could not be listed.')
+        else:
+            _after_commit(_on_artist_saved, artist)
+            flash(f'Artist {data["name"]} was successfully listed!')
+        finally:
+            db.session.close()
+        return render_template('pages/home.html')
+    # Flashing current errors
+    for input, errors in form.errors.items():
+        flash(f'Invalid value for "{input}". {"".join(errors)}')
+    return render_template('forms/new_artist.html', form=form)
+
+#  Artists Delete
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/<artist_id>/delete', methods=['DELETE'])
+def delete_artist(artist_id):
+    try:
+        deleted = Artist.delete_many([int(artist_id)])
+        if not deleted:
+            raise LookupError(f'No artist with id {artist_id}')
+        db.session.commit()
+    except:
+        db.session.rollback()
+        flash(f'An error occured. Venue with id {artist_id} could not be deleted')
+    else:
+        _after_commit(_on_artist_deleted, deleted[0])
+        flash(f'Venue with id {artist_id} was successfully deteled!')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+#  Shows
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/shows')
+@read_replica
+@conditional(_table_validators('show', 'venue', 'artist'))
+@cached('shows')
+def shows():
+    filters = {key: request.args[key] for key in ('from', 'to') if request.args.get(key)}
+    try:
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        start = parse_datetime(filters['from']) if 'from' in filters else None
+        end = parse_datetime(filters['to']) if 'to' in filters else None
+    except (ValueError, OverflowError):
+        abort(400)
+    data, next_position = Show.get_feed(after=after, start=start, end=end)
+    next_url = url_for('views.shows', cursor=encode_cursor(*next_position), **filters) if next_position else None
+    return render_template('pages/shows.html', shows=data, filters=filters, next_url=next_url)
+
+
+@blueprint.route('/shows/create')
+def create_shows():
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    form = ShowForm()
+    if form.validate_on_submit():
+        try:
+            data = request.form
+            booking.check_references(form.venue_id.data, form.artist_id.data)
+            start_time = parse_datetime(data['start_time'])
+            show = Show(artist_id=form.artist_id.data,
+                        venue_id=form.venue_id.data,
+                        start_time=start_time,
+                        end_time=start_time + timedelta(minutes=form.duration.data))
+            booking.book(show)
+            db.session.commit()
+        except booking.BookingError as e:
+            db.session.rollback()
+            flash(f'Show could not be listed. {e}')
+            return render_template('forms/new_show.html', form=form)
+        except:
+            db.session.rollback()
+            flash(f'An error occured. Show could not be listed')
+        else:
+            _after_commit(_on_show_saved, show)
+            flash('Show was successfully listed!')
+        finally:
+            db.session.close()
+        return render_template('pages/home.html')
+    # Flashing current errors
+    for input, errors in form.errors.items():
+        flash(f'Invalid value for "{input}". {"".join(errors)}')
+    return render_template('forms/new_show.html', form=form)
+
+
+@blueprint.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+
+@blueprint.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
+